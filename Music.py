@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 import requests
 import time
 #songinput = input('enter song name:-')
@@ -25,19 +26,22 @@ def lyrics(song_name):
     data = response.json()
     song_ini = data['results'][0]
     video_id = song_ini.get('videoId')
-    main = requests.get(f"{API_URL}/song/{video_id}/lyrics")
-    data = main.json()
-    artist = data.get('artist')
-    title = data.get('title')
-    source = data.get('source')
-     
-    print(artist)
-    print(title)
-    print(source)
-    timed = data["lyrics"]
-    prev = 0
-    for line in timed or data.get('lyrics'):
-        start = line["start"] / 1000
-        time.sleep(max(start - prev, 0))
-        print(line["text"])
-        prev = start
+    # Lines are pushed by the server as playback reaches them (no local sleep drift)
+    main = requests.get(f"{API_URL}/song/{video_id}/lyrics/stream", stream=True, timeout=(5, 60))
+    if main.status_code != 200:
+        print(main.json().get('error'))
+        return
+    event = None
+    for raw in main.iter_lines(decode_unicode=True):
+        if raw.startswith('event:'):
+            event = raw[6:].strip()
+        elif raw.startswith('data:'):
+            payload = json.loads(raw[5:])
+            if event == 'meta':
+                print(payload.get('artist'))
+                print(payload.get('title'))
+                print(payload.get('source'))
+            elif event == 'line':
+                print(payload["text"])
+            elif event == 'end':
+                break
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file,render_template
+from flask import Flask, Response, request, jsonify, send_file,render_template
 from flask_cors import CORS
 from ytmusicapi import YTMusic,OAuthCredentials
 from pytubefix import YouTube
@@ -8,9 +8,22 @@ import tempfile
 import logging
 from urllib.parse import quote
 import requests
-from downloader import start_async_download, get_download_status, get_download_file
+from downloader import start_async_download, get_download_status, get_download_file, QueueFull
+import downloader
+import transcode
+import playlist_export
+import segment_cache
+import dash_manifest
+import stream_variants
+from playlist_pages import playlist_pages, decode_cursor, InvalidCursor
+from playlist_index import playlist_index
+from tagged_cache import TaggedCache
+from catalog import catalog
+from suggest_index import suggest_index
+from library_mirror import library_mirror, SORTS as LIBRARY_SORTS
 from flask_caching import Cache
-from lyrics import start_lyrica
+from lyrics import LYRICA_PORT, start_lyrica, resolve_lyrics, lyric_lines, get_timeline, LyricaError
+from lyrics_cache import lyrics_cache
 import subprocess
 import time
 import requests
@@ -19,10 +32,15 @@ import re
 import hashlib
 import json
 from pytubefix import Search
-from auth_helper import initialize_auth
+import startup
+import http_pool
+import ytm_pool
+from expiry import expiry
 
 
-ytmusic = initialize_auth()
+# Guest and authenticated YTMusic pools are built in the background; see
+# startup.py and ytm_pool.py. `ytmusic` routes each call to the right pool.
+ytmusic = ytm_pool.ytmusic
 
 
 # Set up logging
@@ -31,12 +49,16 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app and enable CORS
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
+# Let the front server send finished downloads (see downloader.SENDFILE_MODE)
+app.config["USE_X_SENDFILE"] = downloader.SENDFILE_MODE == "x-sendfile"
 #Initialize Caching
 cache = Cache(app, config={
     "CACHE_TYPE": "filesystem",
     "CACHE_DIR": "cache",
     "CACHE_DEFAULT_TIMEOUT": 300
 })
+# User-specific views (playlists, library) are cached per tag and evicted by the endpoints that change them
+tagged_cache = TaggedCache(cache)
 
 #authentication
 
@@ -229,7 +251,7 @@ def format_track_data(track, fetch_missing_thumbnails=False):
             f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
         ]
 
-    return {
+    formatted = {
         "title": title,
         "videoId": video_id,
         "artists": artists,
@@ -237,6 +259,20 @@ def format_track_data(track, fetch_missing_thumbnails=False):
         "duration": duration,
         "thumbnails": thumbnails
     }
+
+    # --- Remember it for local search ---
+    if track.get("videoId"):
+        catalog.observe("track", video_id, title, ", ".join(artists), album, formatted)
+    elif video_id.startswith("MPRE"):
+        catalog.observe("album", video_id, title, ", ".join(artists), "", formatted)
+    return formatted
+
+
+# The library mirror stores tracks in the same shape and drops cached
+# library responses whenever a sync brings in changes
+library_mirror.format_track = format_track_data
+library_mirror.on_change = lambda: tagged_cache.invalidate("library", "uploads")
+
 # Root endpoint
 
 @app.route("/", methods=["GET"])
@@ -244,88 +280,254 @@ def root():
     return jsonify({
         "message": "Welcome to the Enhanced YouTube Music & Video API",
         "music_endpoints": [
-            "/search", "/playlist", "/song/<id>", "/stream/<id>", 
-            "/song/<id>/related", "/song/<id>/lyrics", "/charts"
+            "/search", "/playlist", "/song/<id>", "/stream/<id>", "/stream/<id>/proxy",
+            "/song/<id>/related", "/song/<id>/lyrics", "/song/<id>/lyrics/at",
+            "/song/<id>/lyrics/stream", "/charts"
         ],
         "video_endpoints": [
-            "/video/search", "/video/<id>/stream", "/video/<id>/download",
+            "/video/search", "/video/<id>/stream", "/video/<id>/manifest.mpd", "/video/<id>/download",
             "/trending?type=videos"
         ],
         "podcast_endpoints": [
             "/podcast/search", "/podcast/<id>/episodes", "/trending?type=podcasts"
         ],
         "utility_endpoints": [
-            "/suggestions", "/batch", "/download/status/<job_id>", "/app"
+            "/suggestions", "/batch", "/download/status/<job_id>", "/download/<id>/stream",
+            "/download/playlist/<id>", "/download/events/<job_id>", "/download/events?ids=",
+            "/app", "/ready", "/metrics"
         ]
     })
 
 
+# Readiness probe: reports each deferred subsystem's state
+@app.route("/ready", methods=["GET"])
+def readiness():
+    ready = startup.is_ready()
+    subsystems = startup.status()
+    if lyrica_supervisor and "lyrica" in subsystems:
+        # The sidecar can die or recover after init; report its live state
+        subsystems["lyrica"]["state"] = "ready" if lyrica_supervisor.ready else "unavailable"
+        subsystems["lyrica"]["sidecar"] = lyrica_supervisor.describe()
+    return jsonify({
+        "ready": ready,
+        "subsystems": subsystems
+    }), 200 if ready else 503
+
+
+# Outbound HTTP and cache statistics
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return jsonify({
+        "http": http_pool.metrics(),
+        "ytmusic": ytm_pool.stats(),
+        "downloads": dict(downloader.scheduler.describe(), watchers=downloader.job_watchers.count()),
+        "artifact_cache": downloader.artifact_cache.stats(),
+        "ffmpeg": transcode.stats(),
+        "lyrics_cache": lyrics_cache.stats(),
+        "lyrica": lyrica_supervisor.describe() if lyrica_supervisor else None,
+        "playlist_pages": playlist_pages.stats(),
+        "playlist_index": playlist_index.stats(),
+        "tagged_cache": tagged_cache.stats(),
+        "library_mirror": library_mirror.stats(),
+        "catalog": catalog.stats(),
+        "suggest_index": suggest_index.stats(),
+        "expiry": expiry.stats(),
+        "audio_proxy": audio_proxy.stats() if audio_proxy else {"enabled": False}
+    })
+
+
 # Serve music app
 @app.route("/app")
 def serve_app():
     return render_template('index.html')
 
+# Search sources: upstream (default), local catalogue only, or hybrid
+SEARCH_SOURCES = ("upstream", "local", "hybrid")
+
+def search_with_catalog(kind, query, source, fetch, limit, offset=0, local=True):
+    """
+    Run a search against the local catalogue and/or upstream.
+
+    - upstream: ask upstream; if it is throttling or unreachable, answer
+      from the catalogue instead ("fallback").
+    - local: catalogue only.
+    - hybrid: answer from the catalogue and refresh the query from upstream
+      in the background, so the next search sees the merged results. With
+      no local matches yet, upstream is asked right away.
+
+    fetch() returns the full formatted upstream result list; formatting
+    indexes the results into the catalogue as a side effect. local=False
+    marks a query the catalogue cannot answer faithfully (e.g. a filtered
+    search): it always goes upstream, with no fallback.
+
+    Returns:
+        (items for [offset, offset+limit), total count, source used)
+    """
+    if source != "upstream" and local:
+        items, total = catalog.search(kind, query, limit, offset)
+        if source == "local":
+            return items, total, "local"
+        if total:
+            catalog.refresh((kind, query.strip().lower()), fetch)
+            return items, total, "local"
+    try:
+        results = fetch()
+    except Exception as e:
+        if not local or not ytm_pool.is_client_fault(e):
+            raise
+        items, total = catalog.search(kind, query, limit, offset)
+        if not total:
+            raise
+        logger.warning(f"Upstream {kind} search failed ({e}), answering from the catalogue")
+        return items, total, "fallback"
+    return results[offset:offset + limit], len(results), "upstream"
+
+def index_search_results(results):
+    """Catalogue the albums, artists and podcasts in a mixed search response"""
+    for result in results:
+        result_type = result.get("resultType")
+        if result_type == "album":
+            format_track_data(result)
+        elif result_type == "artist":
+            safe_format_artist_basic_info(result)
+        elif result_type == "podcast":
+            format_podcast_result(result)
+
+def catalog_search_response(payload, source):
+    response = jsonify(dict(payload, source=source))
+    response.headers["X-Search-Source"] = source
+    return response
+
+# Local and fallback answers are not cached; upstream ones are
+def skip_local_search():
+    return request.args.get("source") in ("local", "hybrid")
+
+def upstream_search_only(response):
+    if isinstance(response, tuple):     # error responses
+        return False
+    return response.headers.get("X-Search-Source", "upstream") == "upstream"
+
 # Search endpoint
 @app.route("/search", methods=["GET"])
-@cache.cached(query_string=True)   
-
+@cache.cached(query_string=True, unless=skip_local_search, response_filter=upstream_search_only)
 def search_music():
     try:
         query = request.args.get("q")
         filter_type = request.args.get("filter")
         page = request.args.get("page", 1, type=int)
         page_size = request.args.get("page_size", 20, type=int)
+        source = request.args.get("source", "upstream")
         
         if not query:
             return jsonify({"error": "Missing query parameter 'q'"}), 400
         if page < 1 or page_size < 1:
             return jsonify({"error": "Invalid page or page_size"}), 400
+        if source not in SEARCH_SOURCES:
+            return jsonify({"error": f"Invalid 'source'. Use one of: {', '.join(SEARCH_SOURCES)}"}), 400
         
-        search_results = ytmusic.search(query, filter=filter_type)
-        results = [
-            format_track_data(result) for result in search_results
-            if result.get("resultType") in ["song", "video"]
-        ]
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated_results = results[start:end]
+        def fetch():
+            search_results = ytmusic.search(query, filter=filter_type)
+            index_search_results(search_results)
+            return [
+                format_track_data(result) for result in search_results
+                if result.get("resultType") in ["song", "video"]
+            ]
         
-        return jsonify({
+        # The catalogue does not record which filter a track matched
+        paginated_results, total, used = search_with_catalog(
+            "track", query, source, fetch, page_size, (page - 1) * page_size, local=not filter_type
+        )
+        if total and page == 1:
+            suggest_index.learn_query(query)
+        
+        return catalog_search_response({
             "query": query,
             "results": paginated_results,
             "count": len(paginated_results),
-            "total_count": len(results),
+            "total_count": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": (len(results) + page_size - 1) // page_size
-        })
+            "total_pages": (total + page_size - 1) // page_size
+        }, used)
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         return jsonify({"error": f"Search failed: {str(e)}"}), 500
 
 # Playlist endpoint
 @app.route("/playlist", methods=["GET"])
+@tagged_cache.cached(lambda: [f"playlist:{request.args.get('id')}"],
+                     unless=lambda: request.args.get("format") == "ndjson")
 def get_playlist():
+    """
+    Playlist tracks over upstream continuation pages.
+    Returns up to `limit` tracks plus `next_cursor` to continue from; with
+    ?format=ndjson the tracks are streamed one per line as pages arrive.
+    """
     try:
         playlist_id = request.args.get("id")
         limit = request.args.get("limit", 100, type=int)
+        cursor = request.args.get("cursor")
         
         if not playlist_id:
             return jsonify({"error": "Missing playlist_id parameter 'id'"}), 400
+        if limit < 1:
+            return jsonify({"error": "Invalid limit parameter"}), 400
         
-        playlist = ytmusic.get_playlist(playlist_id, limit=limit)
-        tracks = [format_track_data(track) for track in playlist.get("tracks", [])]
-        return jsonify({
+        index, offset, token = decode_cursor(playlist_id, cursor) if cursor else (0, 0, None)
+        first = playlist_pages.page(playlist_id, index, token)
+        # Only page 0 carries the header; later pages reuse its cached copy
+        meta = (first if index == 0 else playlist_pages.page(playlist_id, 0)).get("meta", {})
+        
+        if request.args.get("format") == "ndjson":
+            return Response(stream_playlist(playlist_id, meta, index, offset, token, request.args.get("limit", type=int)),
+                            mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+        
+        tracks, next_cursor = [], cursor
+        for track, next_cursor in playlist_pages.iter_tracks(playlist_id, index, offset, token):
+            tracks.append(format_track_data(track))
+            if len(tracks) >= limit:
+                break
+        else:
+            next_cursor = None
+        if not tracks:
+            next_cursor = None
+        
+        result = {
             "playlist_id": playlist_id,
-            "title": playlist.get("title", ""),
-            "description": playlist.get("description", ""),
-            "track_count": playlist.get("track_count", 0),
-            "tracks": tracks
-        })
+            "tracks": tracks,
+            "next_cursor": next_cursor
+        }
+        if meta:
+            result.update({
+                "title": meta.get("title", ""),
+                "description": meta.get("description", ""),
+                "track_count": meta.get("track_count") or 0
+            })
+        return jsonify(result)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Playlist error: {str(e)}")
         return jsonify({"error": f"Failed to fetch playlist: {str(e)}"}), 500
 
+def stream_playlist(playlist_id, meta, index, offset, token, limit=None):
+    """NDJSON lines: the playlist header, one line per track, then an end marker"""
+    yield json.dumps({"type": "playlist", "playlist_id": playlist_id, **meta}) + "\n"
+    count, cursor = 0, None
+    try:
+        for track, cursor in playlist_pages.iter_tracks(playlist_id, index, offset, token):
+            yield json.dumps({"type": "track", **format_track_data(track)}) + "\n"
+            count += 1
+            if limit and count >= limit:
+                break
+        else:
+            cursor = None
+    except Exception as e:
+        logger.error(f"Playlist stream error: {str(e)}")
+        yield json.dumps({"type": "error", "error": str(e), "next_cursor": cursor}) + "\n"
+        return
+    yield json.dumps({"type": "end", "count": count, "next_cursor": cursor}) + "\n"
+
 # Create playlist endpoint
 @app.route("/playlist/create", methods=["POST"])
 def create_playlist():
@@ -344,6 +546,8 @@ def create_playlist():
             return jsonify({"error": "Invalid 'privacy_status'. Use 'PUBLIC', 'PRIVATE', or 'UNLISTED'"}), 400
         
         playlist_id = ytmusic.create_playlist(title, description, privacy_status=privacy_status)
+        tagged_cache.invalidate("library")
+        library_mirror.refresh_soon()
         return jsonify({
             "playlist_id": playlist_id,
             "title": title,
@@ -371,15 +575,21 @@ def add_to_playlist():
         if not video_ids or not isinstance(video_ids, list):
             return jsonify({"error": "'video_ids' must be a non-empty list"}), 400
         
-        # Check for duplicates
-        playlist = ytmusic.get_playlist(playlist_id, limit=100)
-        existing_video_ids = {track.get("videoId") for track in playlist.get("tracks", [])}
-        new_video_ids = [vid for vid in video_ids if vid not in existing_video_ids]
+        # Check for duplicates against the local membership index
+        existing_video_ids = playlist_index.members(playlist_id)
+        new_video_ids = list(dict.fromkeys(vid for vid in video_ids if vid not in existing_video_ids))
         
         if not new_video_ids:
             return jsonify({"message": "All provided video IDs are already in the playlist"}), 200
         
         result = ytmusic.add_playlist_items(playlist_id, new_video_ids)
+        if isinstance(result, dict) and "SUCCEEDED" in result.get("status", ""):
+            playlist_index.record_added(playlist_id, result.get("playlistEditResults"))
+        else:
+            playlist_index.forget(playlist_id)
+        playlist_pages.invalidate(playlist_id)
+        tagged_cache.invalidate(f"playlist:{playlist_id}", "library")
+        library_mirror.refresh_soon()
         return jsonify({
             "playlist_id": playlist_id,
             "added_video_ids": new_video_ids,
@@ -406,14 +616,21 @@ def remove_from_playlist():
         if not video_ids or not isinstance(video_ids, list):
             return jsonify({"error": "'video_ids' must be a non-empty list"}), 400
         
-        playlist = ytmusic.get_playlist(playlist_id, limit=100)
-        tracks = playlist.get("tracks", [])
-        set_video_ids = [track.get("setVideoId") for track in tracks if track.get("videoId") in video_ids]
+        members = playlist_index.members(playlist_id)
+        items = [{"videoId": vid, "setVideoId": set_video_id}
+                 for vid in dict.fromkeys(video_ids) for set_video_id in members.get(vid, []) if set_video_id]
         
-        if not set_video_ids:
+        if not items:
             return jsonify({"message": "None of the provided video IDs are in the playlist"}), 200
         
-        result = ytmusic.remove_playlist_items(playlist_id, set_video_ids)
+        result = ytmusic.remove_playlist_items(playlist_id, items)
+        if isinstance(result, str) and "SUCCEEDED" in result:
+            playlist_index.record_removed(playlist_id, items)
+        else:
+            playlist_index.forget(playlist_id)
+        playlist_pages.invalidate(playlist_id)
+        tagged_cache.invalidate(f"playlist:{playlist_id}", "library")
+        library_mirror.refresh_soon()
         return jsonify({
             "playlist_id": playlist_id,
             "removed_video_ids": video_ids,
@@ -437,43 +654,73 @@ def get_song_details(video_id):
         return jsonify({"error": f"Failed to fetch song details: {str(e)}"}), 500
 
 # Stream URL endpoint
+STREAM_QUALITY = {
+    "low": (0, 64),
+    "medium": (64, 128),
+    "high": (128, float("inf"))
+}
+
+def select_audio_stream(yt, quality):
+    """Lowest-bitrate mp4 audio stream inside the quality bucket, or None"""
+    min_bitrate, max_bitrate = STREAM_QUALITY[quality]
+    streams = yt.streams.filter(only_audio=True, file_extension="mp4").order_by("abr")
+    for s in streams:
+        abr = s.abr.replace("kbps", "") if s.abr else "0"
+        try:
+            bitrate = float(abr)
+            if min_bitrate <= bitrate <= max_bitrate:
+                return s
+        except ValueError:
+            continue
+    return None
+
+def hinted_cache_key(*args, **kwargs):
+    """Cache key over the path, query string and the Save-Data client hint"""
+    query = sorted(request.args.items(multi=True))
+    save_data = request.headers.get("Save-Data", "").lower() == "on"
+    return "view/" + hashlib.md5(f"{request.path}?{query}|save-data={save_data}".encode("utf-8")).hexdigest()
+
 @app.route("/stream/<video_id>", methods=["GET"])
-@cache.cached(query_string=True)
+@cache.cached(make_cache_key=hinted_cache_key)
 def get_stream_url(video_id):
+    """
+    Negotiate an audio variant from client hints: ?quality=, ?max_kbps=,
+    ?codecs=aac,opus and the Save-Data header. Picks the smallest variant
+    that meets the quality target and returns the full variant list too.
+    """
     try:
-        quality = request.args.get("quality", "medium").lower()
-        quality_map = {
-            "low": (0, 64),
-            "medium": (64, 128),
-            "high": (128, float("inf"))
-        }
-        if quality not in quality_map:
+        save_data = request.headers.get("Save-Data", "").lower() == "on"
+        quality = request.args.get("quality", "low" if save_data else "medium").lower()
+        if quality not in STREAM_QUALITY:
             return jsonify({"error": "Invalid quality. Use 'low', 'medium', or 'high'"}), 400
-        
-        min_bitrate, max_bitrate = quality_map[quality]
+        max_kbps = request.args.get("max_kbps", type=float)
+        codecs = [c.strip().lower() for c in request.args.get("codecs", "").split(",") if c.strip()]
+        codecs = [transcode.normalize_codec(c) for c in codecs] or stream_variants.DEFAULT_CODECS
         
         yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
-        streams = yt.streams.filter(only_audio=True, file_extension="mp4").order_by("abr")
-        stream = None
-        for s in streams:
-            abr = s.abr.replace("kbps", "") if s.abr else "0"
-            try:
-                bitrate = float(abr)
-                if min_bitrate <= bitrate <= max_bitrate:
-                    stream = s
-                    break
-            except ValueError:
-                continue
+        variants = stream_variants.list_variants(yt)
+        stream = stream_variants.choose(variants, quality, max_kbps, codecs)
         
         if not stream:
             return jsonify({"error": f"No suitable audio stream found for quality: {quality}"}), 404
         
-        return jsonify({
+        result = {
             "video_id": video_id,
-            "stream_url": stream.url,
-            "format": "mp4",
-            "bitrate": stream.abr or "unknown"
-        })
+            "stream_url": stream["url"],
+            "format": stream["container"],
+            "codec": stream["codec"],
+            "bitrate": f"{stream['abr_kbps']:g}kbps" if stream["abr_kbps"] else "unknown",
+            "itag": stream["itag"],
+            "filesize": stream["filesize"],
+            "expires_at": stream["expires_at"],
+            "quality": quality,
+            "variants": variants
+        }
+        if audio_proxy:
+            result["proxy_url"] = f"/stream/{video_id}/proxy?quality={quality}"
+        response = jsonify(result)
+        response.headers["Vary"] = "Save-Data"
+        return response
     except AgeRestrictedError:
         logger.error(f"Stream URL error: Video {video_id} is age-restricted")
         return jsonify({"error": "Video is age-restricted and cannot be streamed"}), 403
@@ -484,6 +731,56 @@ def get_stream_url(video_id):
         logger.error(f"Stream URL error: {str(e)}")
         return jsonify({"error": f"Failed to fetch stream URL: {str(e)}"}), 500
 
+def resolve_proxy_source(video_id, quality):
+    yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+    stream = select_audio_stream(yt, quality)
+    if not stream or not stream.filesize:
+        raise VideoUnavailable(video_id)
+    return {"url": stream.url, "size": stream.filesize, "mimetype": stream.mime_type, "itag": stream.itag}
+
+# Opt-in (MUSICANA_AUDIO_PROXY=1): relay audio through the local segment cache
+audio_proxy = segment_cache.AudioProxy(resolve_proxy_source) if segment_cache.ENABLED else None
+
+@app.route("/stream/<video_id>/proxy", methods=["GET"])
+def proxy_stream(video_id):
+    """
+    Serve audio bytes through the shared segment cache, honouring Range.
+    Concurrent listeners of the same track share each upstream segment fetch.
+    """
+    if not audio_proxy:
+        return jsonify({"error": "Audio proxy is disabled"}), 404
+    quality = request.args.get("quality", "medium").lower()
+    if quality not in STREAM_QUALITY:
+        return jsonify({"error": "Invalid quality. Use 'low', 'medium', or 'high'"}), 400
+    try:
+        source = audio_proxy.source(video_id, quality)
+    except AgeRestrictedError:
+        return jsonify({"error": "Video is age-restricted and cannot be streamed"}), 403
+    except VideoUnavailable:
+        return jsonify({"error": "Video is unavailable or invalid"}), 404
+    except Exception as e:
+        logger.error(f"Proxy stream error: {str(e)}")
+        return jsonify({"error": f"Failed to resolve stream: {str(e)}"}), 502
+
+    size = source["size"]
+    start, end, status = 0, size - 1, 200
+    byte_range = request.range
+    if byte_range and byte_range.units == "bytes" and len(byte_range.ranges) == 1:
+        bounds = byte_range.range_for_length(size)
+        if not bounds:
+            return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end, status = bounds[0], bounds[1] - 1, 206
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+        "Cache-Control": "no-cache"
+    }
+    if status == 206:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(audio_proxy.read(video_id, quality, start, end), status=status,
+                    mimetype=source["mimetype"], headers=headers)
+
 # Related content endpoint with endless suggestions
 @app.route("/song/<video_id>/related", methods=["GET"])
 @cache.cached(query_string=True)
@@ -563,7 +860,12 @@ def get_related_content(video_id):
 
 
 # --- In-memory session queues ---
+# Sessions expire after SESSION_TTL idle seconds; past MAX_SESSIONS the least
+# recently used ones go first
 session_queues = {}
+SESSION_TTL = int(os.environ.get("MUSICANA_SESSION_TTL", 1800))
+MAX_SESSIONS = int(os.environ.get("MUSICANA_MAX_SESSIONS", 10000))
+expiry.register("upnext", lambda session_id: session_queues.pop(session_id, None), max_entries=MAX_SESSIONS)
 
 def generate_queue(video_id, limit=20):
     """Helper: generate upnext queue from related songs"""
@@ -579,9 +881,6 @@ def generate_queue(video_id, limit=20):
 @app.route("/song/<video_id>/upnext/start", methods=["POST"])
 def start_upnext(video_id):
     try:
-        # Invalidate all existing sessions (new song means fresh queue)
-        session_queues.clear()
-
         session_id = str(uuid.uuid4())  # auto-generate unique ID
 
         # Current song
@@ -595,6 +894,7 @@ def start_upnext(video_id):
             "current_index": 0,
             "songs": [formatted_current] + queue
         }
+        expiry.schedule("upnext", session_id, SESSION_TTL)
 
         return jsonify({
             "session_id": session_id,
@@ -612,6 +912,7 @@ def get_current_upnext(session_id):
         return jsonify({"error": "Invalid or expired session"}), 400
 
     q = session_queues[session_id]
+    expiry.schedule("upnext", session_id, SESSION_TTL)
     return jsonify({
         "session_id": session_id,
         "current": q["songs"][q["current_index"]],
@@ -629,9 +930,12 @@ def play_next_song(session_id):
 
     # If queue ended, expire session
     if q["current_index"] >= len(q["songs"]):
-        del session_queues[session_id]
+        session_queues.pop(session_id, None)
+        expiry.cancel("upnext", session_id)
         return jsonify({"message": "Queue finished, session ended"}), 200
 
+    expiry.schedule("upnext", session_id, SESSION_TTL)
+
     return jsonify({
         "session_id": session_id,
         "current": q["songs"][q["current_index"]],
@@ -642,64 +946,135 @@ def play_next_song(session_id):
 
 
 # Lyrics endpoint
-lyrica_process = start_lyrica(folder_name="Lyrica")  # or "lyrica" if your folder is lowercase
+lyrica_supervisor = None
+
+def init_lyrica():
+    global lyrica_supervisor
+    lyrica_supervisor = start_lyrica(folder_name="Lyrica", port=LYRICA_PORT)  # or "lyrica" if your folder is lowercase
+    if not lyrica_supervisor:
+        raise RuntimeError("Lyrica sidecar could not be started")
+    if not lyrica_supervisor.ready:
+        # The supervisor keeps restarting it; /metrics shows the live state
+        raise RuntimeError("Lyrica sidecar did not become ready")
+    return lyrica_supervisor
+
+startup.register("lyrica", init_lyrica, required=False)
 @app.route("/song/<video_id>/lyrics", methods=["GET"])
 def get_lyrics(video_id):
     """
     Retrieve synced lyrics for a song using the local Lyrica API.
     """
     try:
-        # Step 1: Get song info from YTMusic
-        song_data = ytmusic.get_song(video_id)
-        title = song_data.get("videoDetails", {}).get("title", "")
-        artist = song_data.get("videoDetails", {}).get("author", "")
+        # Step 1: Song info + Lyrica lookup, served from the lyrics store when possible
+        artist, title, data = resolve_lyrics(video_id, ytmusic.get_song, timeout=15)
 
         if not title or not artist:
             return jsonify({"error": "Could not extract song metadata"}), 400
 
-        # Step 2: Query local Lyrica API
-        lyrica_url = f"http://127.0.0.1:9999/lyrics/?artist={artist}&song={title}&timestamps=true"
-        response = requests.get(lyrica_url, timeout=15)
-
-        if response.status_code != 200:
-            return jsonify({"error": f"Lyrica API failed with {response.status_code}"}), 502
+        # Step 2: Extract lyrics cleanly (timed lines, or plain lines as a fallback)
+        data = data or {}
+        lyrics_list = lyric_lines(data)
 
-        lyrica_data = response.json()
-        logger.info(f"[Lyrica response] {lyrica_data}")
-
-        # Step 3: Extract lyrics cleanly
-        lyrics_list = []
-        if "data" in lyrica_data:
-            if "timed_lyrics" in lyrica_data["data"]:
-                # Use synced/timed lyrics
-                lyrics_list = [
-                    {
-                        "start": line.get("start_time"),
-                        "end": line.get("end_time"),
-                        "text": line.get("text", "")
-                    }
-                    for line in lyrica_data["data"]["timed_lyrics"]
-                ]
-            elif "lyrics" in lyrica_data["data"]:
-                # Fallback: split plain lyrics into lines
-                lyrics_list = [
-                    {"start": None, "end": None, "text": line}
-                    for line in lyrica_data["data"]["lyrics"].splitlines()
-                ]
-
-        # Step 4: Return clean API
+        # Step 3: Return clean API
         return jsonify({
             "video_id": video_id,
             "artist": artist,
             "title": title,
             "lyrics": lyrics_list,
-            "source": lyrica_data.get("data", {}).get("source", "Lyrica API")
+            "source": data.get("source", "Lyrica API")
         })
 
+    except LyricaError as e:
+        return jsonify({"error": str(e)}), 502
     except Exception as e:
         logger.error(f"Lyrics endpoint error for video_id {video_id}: {str(e)}")
         return jsonify({"error": f"Failed to fetch lyrics: {str(e)}"}), 500
 
+# Lyric line at a playback position (for re-syncing after a seek)
+@app.route("/song/<video_id>/lyrics/at", methods=["GET"])
+def get_lyrics_at(video_id):
+    try:
+        position = request.args.get("t", 0, type=int)
+        if position < 0:
+            return jsonify({"error": "Invalid position 't'"}), 400
+
+        _, _, _, timeline = get_timeline(video_id, ytmusic.get_song)
+        if not timeline:
+            return jsonify({"error": "No synced lyrics available"}), 404
+
+        index = timeline.index_at(position)
+        following = timeline.lines[index + 1] if index + 1 < len(timeline) else None
+        return jsonify({
+            "video_id": video_id,
+            "t": position,
+            "index": index,
+            # Clients match on start: index counts timed lines only, in time order
+            "start": timeline.lines[index]["start"] if index >= 0 else None,
+            "line": timeline.lines[index] if index >= 0 else None,
+            "next": following,
+            "ms_until_next": following["start"] - position if following else None
+        })
+    except LyricaError as e:
+        return jsonify({"error": str(e)}), 502
+    except Exception as e:
+        logger.error(f"Lyrics lookup error for video_id {video_id}: {str(e)}")
+        return jsonify({"error": f"Failed to look up lyrics: {str(e)}"}), 500
+
+def sse_event(event, data):
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+
+# Server-pushed synced lyrics
+@app.route("/song/<video_id>/lyrics/stream", methods=["GET"])
+def stream_lyrics(video_id):
+    """
+    Push each lyric line as an SSE event when playback reaches it.
+    Lines are scheduled against a monotonic clock anchored at ?position=<ms>,
+    so timing does not drift; reconnect with a new position after a seek.
+    """
+    try:
+        position = request.args.get("position", 0, type=int)
+        if position < 0:
+            return jsonify({"error": "Invalid 'position'"}), 400
+
+        artist, title, source, timeline = get_timeline(video_id, ytmusic.get_song)
+        if not timeline:
+            return jsonify({"error": "No synced lyrics available"}), 404
+    except LyricaError as e:
+        return jsonify({"error": str(e)}), 502
+    except Exception as e:
+        logger.error(f"Lyrics stream error for video_id {video_id}: {str(e)}")
+        return jsonify({"error": f"Failed to stream lyrics: {str(e)}"}), 500
+
+    def generate():
+        origin = time.monotonic() - position / 1000
+        index = timeline.index_at(position)
+        yield sse_event("meta", {
+            "video_id": video_id, "artist": artist, "title": title,
+            "source": source, "count": len(timeline)
+        })
+        if index >= 0:
+            yield sse_event("line", dict(timeline.lines[index], index=index))
+        for index in range(index + 1, len(timeline)):
+            line = timeline.lines[index]
+            due = origin + line["start"] / 1000
+            while True:
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, SSE_HEARTBEAT))
+                if due - time.monotonic() > 0:
+                    yield ": keep-alive\n\n"
+            yield sse_event("line", dict(line, index=index))
+        yield sse_event("end", {"video_id": video_id})
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 
 
 
@@ -719,6 +1094,11 @@ def rate_song(video_id):
             return jsonify({"error": "Invalid 'rating'. Use 'LIKE', 'DISLIKE', or 'INDIFFERENT'"}), 400
         
         result = ytmusic.rate_song(video_id, rating)
+        # Liked songs is the LM playlist
+        playlist_pages.invalidate("LM")
+        playlist_index.forget("LM")
+        tagged_cache.invalidate("playlist:LM", "library")
+        library_mirror.refresh_soon()
         return jsonify({
             "video_id": video_id,
             "rating": rating,
@@ -814,13 +1194,47 @@ def get_mood_playlists():
         logger.error(f"Mood playlists error: {str(e)}")
         return jsonify({"error": f"Failed to fetch mood playlists: {str(e)}"}), 500
 
-# User library endpoint
+# User library endpoints, served from the local mirror once it has synced
+def mirrored_songs(kind, limit, with_playlists=False):
+    """Page, sort, filter and search the local library mirror"""
+    offset = request.args.get("offset", 0, type=int)
+    sort = request.args.get("sort")
+    order = request.args.get("order")
+    q = request.args.get("q", "").strip()
+    if offset < 0:
+        return jsonify({"error": "Invalid offset parameter"}), 400
+    if sort is not None and sort not in LIBRARY_SORTS:
+        return jsonify({"error": f"Invalid 'sort'. Use one of: {', '.join(LIBRARY_SORTS)}"}), 400
+    if order not in (None, "asc", "desc"):
+        return jsonify({"error": "Invalid 'order'. Use 'asc' or 'desc'"}), 400
+
+    songs, total = library_mirror.songs(
+        kind, limit=limit, offset=offset, sort=sort,
+        descending=None if order is None else order == "desc",
+        q=q or None, artist=request.args.get("artist"), album=request.args.get("album")
+    )
+    result = {
+        "songs": songs,
+        "song_count": len(songs),
+        "total_songs": total,
+        "next_offset": offset + len(songs) if offset + len(songs) < total else None,
+        "source": "mirror"
+    }
+    if with_playlists:
+        playlists = library_mirror.playlists(q or None, limit=limit)
+        result.update({"playlists": playlists, "playlist_count": len(playlists)})
+    return jsonify(result)
+
 @app.route("/user/library", methods=["GET"])
+@tagged_cache.cached(lambda: ["library"])
 def get_user_library():
     try:
         limit = request.args.get("limit", 50, type=int)
         if limit < 1:
             return jsonify({"error": "Invalid limit parameter"}), 400
+
+        if library_mirror.ready("song"):
+            return mirrored_songs("song", limit, with_playlists=True)
         
         try:
             library_songs = ytmusic.get_library_songs(limit=limit)
@@ -856,11 +1270,15 @@ def get_user_library():
 
 # User uploads endpoint
 @app.route("/user/uploads", methods=["GET"])
+@tagged_cache.cached(lambda: ["uploads"])
 def get_user_uploads():
     try:
         limit = request.args.get("limit", 50, type=int)
         if limit < 1:
             return jsonify({"error": "Invalid limit parameter"}), 400
+
+        if library_mirror.ready("upload"):
+            return mirrored_songs("upload", limit)
         
         try:
             uploaded_songs = ytmusic.get_library_upload_songs(limit=limit)
@@ -913,18 +1331,33 @@ def get_top_charts():
 
 # Search suggestions endpoint
 @app.route("/suggestions", methods=["GET"])
-@cache.cached(query_string=True)
 def get_search_suggestions():
+    """
+    Autocomplete from the local prefix index; upstream is only asked for
+    prefixes the index knows too little about, and its answer is learned.
+    """
     try:
         query = request.args.get("q")
         if not query:
             return jsonify({"error": "Missing query parameter 'q'"}), 400
         
-        suggestions = ytmusic.get_search_suggestions(query) or []
+        suggestions, answered = suggest_index.complete(query)
+        source = "local"
+        if not answered:
+            try:
+                upstream = ytmusic.get_search_suggestions(query) or []
+            except Exception as e:
+                if not (suggestions and ytm_pool.is_client_fault(e)):
+                    raise
+                logger.warning(f"Upstream suggestions failed ({e}), answering from the index")
+            else:
+                suggest_index.learn_suggestions(query, upstream)
+                suggestions, source = upstream, "upstream"
         return jsonify({
             "query": query,
             "suggestions": suggestions,
-            "count": len(suggestions)
+            "count": len(suggestions),
+            "source": source
         })
     except Exception as e:
         logger.error(f"Suggestions error: {str(e)}")
@@ -995,14 +1428,99 @@ def start_download(video_id):
     quality = request.args.get("quality", "high").lower()
     if quality not in ["low", "medium", "high"]:
         quality = "high"
-    job_id = start_async_download(video_id, quality)
-    return jsonify({"job_id": job_id, "status": "processing", "progress": 0})
+    priority = request.args.get("priority", "normal").lower()
+    fmt = request.args.get("format", "m4a").lower()
+    if fmt not in transcode.TARGETS:
+        return jsonify({"error": f"Invalid format. Use: {', '.join(transcode.TARGETS)}"}), 400
+    try:
+        job_id = start_async_download(video_id, quality, priority, fmt)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "30"}
+    job = get_download_status(job_id)
+    return jsonify({"job_id": job_id, "status": job["status"], "progress": job["progress"]})
+
+# Stream the download as it is produced (no job, no intermediate file)
+@app.route("/download/<video_id>/stream", methods=["GET"])
+def stream_download(video_id):
+    quality = request.args.get("quality", "high").lower()
+    if quality not in ["low", "medium", "high"]:
+        quality = "high"
+    fmt = request.args.get("format", "m4a").lower()
+    if fmt not in transcode.TARGETS:
+        return jsonify({"error": f"Invalid format. Use: {', '.join(transcode.TARGETS)}"}), 400
+    try:
+        chunks, name, mimetype = downloader.stream_download(video_id, quality, fmt)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "30"}
+    except Exception as e:
+        logger.error(f"Streaming download error: {str(e)}")
+        return jsonify({"error": f"Failed to stream download: {str(e)}"}), 500
+    return Response(chunks, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(name)}",
+        "X-Accel-Buffering": "no"
+    })
+
+# Whole playlist or album as a ZIP, streamed as tracks finish
+@app.route("/download/playlist/<playlist_id>", methods=["GET"])
+def download_playlist(playlist_id):
+    quality = request.args.get("quality", "high").lower()
+    if quality not in ["low", "medium", "high"]:
+        quality = "high"
+    fmt = request.args.get("format", "m4a").lower()
+    if fmt not in transcode.TARGETS:
+        return jsonify({"error": f"Invalid format. Use: {', '.join(transcode.TARGETS)}"}), 400
+    limit = request.args.get("limit", type=int)
+    try:
+        title, tracks = playlist_export.resolve_tracks(playlist_id, limit)
+    except Exception as e:
+        logger.error(f"Playlist export error: {str(e)}")
+        return jsonify({"error": f"Failed to fetch playlist: {str(e)}"}), 500
+    if not tracks:
+        return jsonify({"error": "Playlist has no tracks"}), 404
+    name = f"{title.replace(os.sep, '_')}.zip"
+    return Response(playlist_export.stream_zip(tracks, quality, fmt), mimetype="application/zip", headers={
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(name)}",
+        "X-Accel-Buffering": "no"
+    })
 
 # Check progress
 @app.route("/download/status/<job_id>", methods=["GET"])
 def check_status(job_id):
     return jsonify(get_download_status(job_id))
 
+MAX_EVENT_JOBS = 200    # job ids one multiplexed progress stream may follow
+
+def progress_stream(job_ids):
+    """SSE response pushing changed job fields until every job has finished"""
+    def generate():
+        for update in downloader.job_updates(job_ids, heartbeat=SSE_HEARTBEAT):
+            if update is None:
+                yield ": keep-alive\n\n"
+                continue
+            job_id, changed = update
+            yield sse_event("progress", dict(changed, job_id=job_id))
+        yield sse_event("end", {"job_ids": job_ids})
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+# Push progress for one job
+@app.route("/download/events/<job_id>", methods=["GET"])
+def download_events(job_id):
+    return progress_stream([job_id])
+
+# Push progress for many jobs over one stream: ?ids=<id>,<id>,...
+@app.route("/download/events", methods=["GET"])
+def download_events_multi():
+    job_ids = [job_id for job_id in request.args.get("ids", "").split(",") if job_id.strip()]
+    if not job_ids:
+        return jsonify({"error": "Missing 'ids' parameter"}), 400
+    if len(job_ids) > MAX_EVENT_JOBS:
+        return jsonify({"error": f"At most {MAX_EVENT_JOBS} job ids per stream"}), 400
+    return progress_stream([job_id.strip() for job_id in job_ids])
+
 # Fetch final file
 @app.route("/download/file/<job_id>", methods=["GET"])
 def fetch_file(job_id):
@@ -1012,6 +1530,18 @@ def fetch_file(job_id):
     return file_resp
 
 # Podcast search endpoint
+def format_podcast_result(result):
+    podcast = {
+        "title": result.get("title"),
+        "browseId": result.get("browseId"),
+        "author": result.get("author"),
+        "thumbnails": result.get("thumbnails"),
+        "description": result.get("descriptionSnippet"),
+    }
+    author = podcast["author"]
+    catalog.observe("podcast", podcast["browseId"], podcast["title"],
+                    author.get("name", "") if isinstance(author, dict) else author, "", podcast)
+    return podcast
 
 @app.route("/podcast/search", methods=["GET"])
 def search_podcasts():
@@ -1022,20 +1552,18 @@ def search_podcasts():
     try:
         query = request.args.get("query")
         limit = int(request.args.get("limit", 20))
+        source = request.args.get("source", "upstream")
         if not query:
             return jsonify({"error": "Missing query parameter"}), 400
-        results = ytmusic.search(query, filter="podcasts", limit=limit)
-        podcasts = []
-        for result in results:
-            if result.get("resultType") == "podcast":
-                podcasts.append({
-                    "title": result.get("title"),
-                    "browseId": result.get("browseId"),
-                    "author": result.get("author"),
-                    "thumbnails": result.get("thumbnails"),
-                    "description": result.get("descriptionSnippet"),
-                })
-        return jsonify({"query": query, "podcasts": podcasts, "count": len(podcasts)})
+        if source not in SEARCH_SOURCES:
+            return jsonify({"error": f"Invalid 'source'. Use one of: {', '.join(SEARCH_SOURCES)}"}), 400
+        
+        def fetch():
+            results = ytmusic.search(query, filter="podcasts", limit=limit)
+            return [format_podcast_result(result) for result in results if result.get("resultType") == "podcast"]
+        
+        podcasts, _, used = search_with_catalog("podcast", query, source, fetch, limit)
+        return catalog_search_response({"query": query, "podcasts": podcasts, "count": len(podcasts)}, used)
     except Exception as e:
         logger.error(f"Podcast search error: {str(e)}")
         return jsonify({"error": f"Failed to search podcasts: {str(e)}"}), 500
@@ -1049,7 +1577,7 @@ def get_real_video_id(title):
         query = title.replace(" ", "+")
         url = YOUTUBE_SEARCH_URL + query
 
-        html = requests.get(url, timeout=3).text
+        html = http_pool.get(url, timeout=3).text
 
         # Find first videoId using regex
         match = re.search(r"videoId\":\"([a-zA-Z0-9_-]{11})", html)
@@ -1263,6 +1791,31 @@ def get_video_stream(video_id):
 
 
 
+# DASH manifest over the adaptive (video-only + audio-only) formats
+@app.route("/video/<video_id>/manifest.mpd", methods=["GET"])
+@cache.cached(query_string=True)
+def get_video_manifest(video_id):
+    try:
+        max_height = request.args.get("max_height", type=int)
+        yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+        # Building the streams deciphers the urls; take them from there
+        urls = {stream.itag: stream.url for stream in yt.streams}
+        formats = [dict(fmt, url=urls.get(int(fmt["itag"]), fmt.get("url")))
+                   for fmt in yt.streaming_data.get("adaptiveFormats", [])]
+        formats = dash_manifest.usable_formats(formats, max_height)
+        if not formats:
+            return jsonify({"error": "No adaptive formats available"}), 404
+        mpd = dash_manifest.build_mpd(formats, yt.length)
+        return Response(mpd, mimetype="application/dash+xml")
+    except AgeRestrictedError:
+        return jsonify({"error": "Video is age-restricted and cannot be streamed"}), 403
+    except VideoUnavailable:
+        return jsonify({"error": "Video is unavailable or invalid"}), 404
+    except Exception as e:
+        logger.error(f"Video manifest error: {str(e)}")
+        return jsonify({"error": f"Failed to build manifest: {str(e)}"}), 500
+
+
 # Enhanced trending endpoint for all content types with regional support
 @app.route("/trending", methods=["GET"])
 @cache.cached(query_string=True)
@@ -1896,42 +2449,44 @@ def get_related_artists(artist_id):
         return jsonify({"error": f"Failed to fetch related artists: {str(e)}"}), 500
 
 @app.route("/artist/search", methods=["GET"])
-@cache.cached(query_string=True)
+@cache.cached(query_string=True, unless=skip_local_search, response_filter=upstream_search_only)
 def search_artists():
     """Search for artists with enhanced filtering"""
     try:
         query = request.args.get("q")
         page = request.args.get("page", 1, type=int)
         page_size = request.args.get("page_size", 20, type=int)
+        source = request.args.get("source", "upstream")
         
         if not query:
             return jsonify({"error": "Missing query parameter 'q'"}), 400
             
         if page < 1 or page_size < 1:
             return jsonify({"error": "Invalid page or page_size"}), 400
+        if source not in SEARCH_SOURCES:
+            return jsonify({"error": f"Invalid 'source'. Use one of: {', '.join(SEARCH_SOURCES)}"}), 400
         
         # Search for artists
-        search_results = ytmusic.search(query, filter="artists")
-        
-        artists = []
-        for result in search_results:
-            if result.get("resultType") == "artist":
-                artist_info = safe_format_artist_basic_info(result)
-                artists.append(artist_info)
+        def fetch():
+            search_results = ytmusic.search(query, filter="artists")
+            return [
+                safe_format_artist_basic_info(result) for result in search_results
+                if result.get("resultType") == "artist"
+            ]
         
         # Pagination
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated_artists = artists[start:end]
+        paginated_artists, total, used = search_with_catalog(
+            "artist", query, source, fetch, page_size, (page - 1) * page_size
+        )
         
-        return jsonify({
+        return catalog_search_response({
             "query": query,
             "artists": paginated_artists,
             "count": len(paginated_artists),
-            "total_count": len(artists),
+            "total_count": total,
             "page": page,
-            "total_pages": (len(artists) + page_size - 1) // page_size
-        })
+            "total_pages": (total + page_size - 1) // page_size
+        }, used)
         
     except Exception as e:
         logger.error(f"Artist search error: {str(e)}")
@@ -2117,7 +2672,7 @@ def safe_format_album_data(album):
 
 def safe_format_artist_basic_info(artist_data):
     """Format basic artist information safely"""
-    return {
+    info = {
         "name": (
             safe_get_nested(artist_data, ["artist"]) or
             safe_get_nested(artist_data, ["title"]) or
@@ -2128,6 +2683,8 @@ def safe_format_artist_basic_info(artist_data):
         "subscriber_count": safe_get_nested(artist_data, ["subscriberCount"], ""),
         "thumbnails": safe_extract_thumbnails_generic(artist_data)
     }
+    catalog.observe("artist", info["browse_id"], info["name"], "", "", info)
+    return info
 
 def safe_extract_thumbnails_generic(item):
     """Extract thumbnails from any item type safely"""
@@ -2235,6 +2792,9 @@ def play_podcast_episode(videoId):
 
 
 
+# Warm up auth, Lyrica and the downloader concurrently without blocking import
+startup.start_all()
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
 
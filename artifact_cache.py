@@ -0,0 +1,149 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("MUSICANA_ARTIFACT_DIR", os.path.join("data", "audio"))
+CACHE_BYTES = int(os.environ.get("MUSICANA_ARTIFACT_BYTES", 2 * 1024 ** 3))
+# Bump when the embedded tags/cover change so stale artifacts stop matching
+METADATA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (last_access);
+"""
+
+
+def artifact_key(video_id, quality, *extra):
+    """Cache key for a finished download: (video_id, quality, metadata version, ...)"""
+    parts = [video_id, quality, f"v{METADATA_VERSION}", *map(str, extra)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed disk cache of finished audio files.
+
+    Files live at <dir>/<sha[:2]>/<sha><ext>; a SQLite index maps job keys to
+    content hashes, so identical outputs are stored once. Least recently
+    used entries are evicted when the total size exceeds the byte budget.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.db"),
+                                         timeout=10, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _path(self, sha256, name):
+        return os.path.join(self.directory, sha256[:2], sha256 + os.path.splitext(name)[1])
+
+    def lookup(self, key):
+        """Return {"path", "name", "sha256", "size"} for a cached artifact, or None"""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT sha256, name, size FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row:
+                path = self._path(row[0], row[1])
+                if os.path.exists(path):
+                    with db:
+                        db.execute("UPDATE artifacts SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self.hits += 1
+                    return {"path": path, "name": row[1], "sha256": row[0], "size": row[2]}
+                with db:
+                    db.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def store(self, key, src_path, name):
+        """Move a finished file into the cache and return its lookup() record"""
+        sha256 = _file_sha256(src_path)
+        size = os.path.getsize(src_path)
+        path = self._path(sha256, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(src_path)
+        else:
+            shutil.move(src_path, path)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO artifacts (key, sha256, name, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, sha256, name, size, now, now)
+                )
+            self._evict(keep=key)
+        return {"path": path, "name": name, "sha256": sha256, "size": size}
+
+    def _evict(self, keep=None):
+        db = self._db()
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, sha256, name, size in db.execute(
+            "SELECT key, sha256, name, size FROM artifacts ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            with db:
+                db.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            # Only drop the file once no other key points at the same content
+            if not db.execute("SELECT 1 FROM artifacts WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone():
+                try:
+                    os.remove(self._path(sha256, name))
+                except OSError:
+                    pass
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts"
+            ).fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+artifact_cache = ArtifactCache()
@@ -9,10 +9,10 @@ ORIGIN = "https://music.youtube.com"
 # -----------------------------
 # 1. OAUTH AUTHENTICATION
 # -----------------------------
-def get_oauth():
+def get_oauth(path="oauth.json"):
     """Try loading OAuth credentials."""
     try:
-        return YTMusic("oauth.json")
+        return YTMusic(path)
     except Exception as e:
         print("⚠ OAuth failed:", e)
         return None
@@ -21,9 +21,9 @@ def get_oauth():
 # -----------------------------
 # 2. HEADER.JSON LOADING
 # -----------------------------
-def load_header():
+def load_header(path="header.json"):
     try:
-        with open("header.json", "r") as f:
+        with open(path, "r") as f:
             return json.load(f)
     except:
         return None
@@ -43,9 +43,9 @@ def extract_sapisid(cookie_string):
 # -----------------------------
 # 4. AUTO SAPISIDHASH GENERATOR
 # -----------------------------
-def build_dynamic_auth():
+def build_dynamic_auth(path="header.json"):
     """Builds a fresh SAPISIDHASH using header.json."""
-    header = load_header()
+    header = load_header(path)
     if not header:
         return None
 
@@ -78,8 +78,8 @@ def build_dynamic_auth():
 # -----------------------------
 # 5. YTMUSIC INSTANCE USING HEADER
 # -----------------------------
-def get_header_auth():
-    auth = build_dynamic_auth()
+def get_header_auth(path="header.json"):
+    auth = build_dynamic_auth(path)
     if not auth:
         return None
 
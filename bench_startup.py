@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Measures how long `import api` takes (the point where the server can bind
+# and answer /ready) and how long until every deferred subsystem is ready.
+# Usage: python3 bench_startup.py [runs]
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import api
+imported = time.perf_counter() - t0
+client = api.app.test_client()
+first = client.get("/ready")
+first_probe = time.perf_counter() - t0
+deadline = time.time() + 120
+while client.get("/ready").status_code != 200 and time.time() < deadline:
+    time.sleep(0.05)
+print(json.dumps({
+    "import_s": imported,
+    "first_probe_s": first_probe,
+    "first_probe_status": first.status_code,
+    "all_ready_s": time.perf_counter() - t0,
+    "subsystems": api.startup.status(),
+}))
+"""
+
+
+def run_once():
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=here,
+                         capture_output=True, text=True, timeout=180)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(out.stderr.strip() or "probe produced no output")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    results = []
+    for i in range(runs):
+        start = time.time()
+        result = run_once()
+        results.append(result)
+        print(f"run {i + 1}: import {result['import_s']:.3f}s, "
+              f"first /ready {result['first_probe_s']:.3f}s ({result['first_probe_status']}), "
+              f"all ready {result['all_ready_s']:.3f}s, wall {time.time() - start:.2f}s")
+
+    best = min(r["import_s"] for r in results)
+    print(f"\nbest import time: {best:.3f}s")
+    print("last subsystem states:")
+    for name, info in results[-1]["subsystems"].items():
+        print(f"  {name:20} {info['state']:8} {info['elapsed']}s {info['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from library_mirror import fts_query
+import startup
+
+logger = logging.getLogger(__name__)
+
+# Everything formatted from an upstream response is queued here and written
+# to SQLite in batches by one thread, so indexing never slows a request down.
+# When the queue is full new sightings are dropped; they will be seen again.
+DB_PATH = os.environ.get("MUSICANA_CATALOG_DB", os.path.join("data", "catalog.db"))
+MAX_ITEMS = int(os.environ.get("MUSICANA_CATALOG_MAX_ITEMS", 200000))
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+REFRESH_TTL = 300       # seconds before the same query is refreshed from upstream again
+REFRESH_WORKERS = 2
+
+KINDS = ("track", "artist", "album", "podcast")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT,
+    subtitle TEXT,
+    album TEXT,
+    payload TEXT NOT NULL,
+    seen INTEGER NOT NULL DEFAULT 1,
+    last_seen REAL NOT NULL,
+    UNIQUE (kind, item_id)
+);
+CREATE INDEX IF NOT EXISTS items_last_seen ON items (last_seen);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, subtitle, album, content='items', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title, subtitle, album) VALUES (new.id, new.title, new.subtitle, new.album);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, subtitle, album)
+    VALUES ('delete', old.id, old.title, old.subtitle, old.album);
+END;
+CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE OF title, subtitle, album ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, subtitle, album)
+    VALUES ('delete', old.id, old.title, old.subtitle, old.album);
+    INSERT INTO items_fts (rowid, title, subtitle, album) VALUES (new.id, new.title, new.subtitle, new.album);
+END;
+"""
+
+
+class Catalog:
+    """
+    Local FTS5 index of every track, artist, album and podcast seen upstream.
+
+    Each item is stored with the payload the API already returned for it,
+    so search results can be served in the same shape without upstream.
+    Items seen more often rank higher among equally relevant matches; the
+    least recently seen are pruned beyond max_items.
+    """
+
+    def __init__(self, path=DB_PATH, max_items=MAX_ITEMS, refresh_ttl=REFRESH_TTL):
+        self.path = path
+        self.max_items = max_items
+        self.refresh_ttl = refresh_ttl
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._thread = None
+        self._refresh_lock = threading.Lock()
+        self._refreshed = {}        # query key -> time of last upstream refresh
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(REFRESH_WORKERS, thread_name_prefix="catalog-refresh")
+        self.listeners = []         # called from the writer with [(kind, title, subtitle, times seen)]
+        self.indexed = 0
+        self.dropped = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    # --- Indexing ---
+
+    def observe(self, kind, item_id, title, subtitle, album, payload):
+        """Queue an item seen in an upstream response; never blocks"""
+        if not item_id or not title:
+            return
+        try:
+            self._queue.put_nowait((kind, item_id, title, subtitle or "", album or "", payload, time.time()))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.warning(f"Catalog write failed: {e}")
+
+    def _write(self, batch):
+        # Collapse repeats within the batch into one row with a count
+        merged = {}
+        for kind, item_id, title, subtitle, album, payload, seen_at in batch:
+            entry = merged.get((kind, item_id))
+            merged[(kind, item_id)] = (title, subtitle, album, payload, seen_at, (entry[5] if entry else 0) + 1)
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO items (kind, item_id, title, subtitle, album, payload, seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, item_id) DO UPDATE SET seen = seen + excluded.seen, "
+                "last_seen = excluded.last_seen, payload = excluded.payload",
+                [(kind, item_id, title, subtitle, album, json.dumps(payload), count, seen_at)
+                 for (kind, item_id), (title, subtitle, album, payload, seen_at, count) in merged.items()]
+            )
+            # Only touch the text columns (and so the FTS index) when they changed
+            conn.executemany(
+                "UPDATE items SET title = ?, subtitle = ?, album = ? WHERE kind = ? AND item_id = ? "
+                "AND (title IS NOT ? OR subtitle IS NOT ? OR album IS NOT ?)",
+                [(title, subtitle, album, kind, item_id, title, subtitle, album)
+                 for (kind, item_id), (title, subtitle, album, _, _, _) in merged.items()]
+            )
+            total = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            if total > self.max_items:
+                conn.execute(
+                    "DELETE FROM items WHERE id IN (SELECT id FROM items ORDER BY last_seen LIMIT ?)",
+                    (total - self.max_items,)
+                )
+        self.indexed += len(merged)
+        seen = [(kind, title, subtitle, count)
+                for (kind, _), (title, subtitle, _, _, _, count) in merged.items()]
+        for listener in self.listeners:
+            try:
+                listener(seen)
+            except Exception as e:
+                logger.warning(f"Catalog listener failed: {e}")
+
+    # --- Queries ---
+
+    def search(self, kind, query, limit=20, offset=0):
+        """
+        Matching payloads of one kind, best first: every word must match
+        title, artists/author or album, the last one as a prefix.
+
+        Returns:
+            (list of payloads, total matching count)
+        """
+        match = fts_query(query)
+        if not match:
+            return [], 0
+        conn = self._conn()
+        clause = "FROM items_fts f JOIN items i ON i.id = f.rowid WHERE items_fts MATCH ? AND i.kind = ?"
+        total = conn.execute(f"SELECT COUNT(*) {clause}", (match, kind)).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT i.payload {clause} ORDER BY bm25(items_fts), i.seen DESC LIMIT ? OFFSET ?",
+            (match, kind, limit, offset)
+        ).fetchall()
+        if total:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return [json.loads(row[0]) for row in rows], total
+
+    def popular(self, limit):
+        """(kind, title, subtitle, times seen) of the most frequently seen items"""
+        return self._conn().execute(
+            "SELECT kind, title, subtitle, seen FROM items ORDER BY seen DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def refresh(self, key, fetch):
+        """
+        Run fetch() in the background to pull fresh upstream results for a
+        query (which get indexed as they are formatted). Each key is
+        refreshed at most once per refresh_ttl and never twice at a time.
+        """
+        now = time.time()
+        with self._refresh_lock:
+            if key in self._refreshing or now - self._refreshed.get(key, 0) < self.refresh_ttl:
+                return False
+            self._refreshing.add(key)
+            if len(self._refreshed) > QUEUE_SIZE:
+                self._refreshed = {k: t for k, t in self._refreshed.items() if now - t < self.refresh_ttl}
+        self._refresh_pool.submit(self._run_refresh, key, fetch)
+        return True
+
+    def _run_refresh(self, key, fetch):
+        try:
+            fetch()
+            self.refreshes += 1
+        except Exception as e:
+            logger.warning(f"Catalog refresh for {key} failed: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+                self._refreshed[key] = time.time()
+
+    def stats(self):
+        counts = dict(self._conn().execute("SELECT kind, COUNT(*) FROM items GROUP BY kind").fetchall())
+        return {
+            "items": {kind: counts.get(kind, 0) for kind in KINDS},
+            "indexed": self.indexed,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes
+        }
+
+
+catalog = Catalog()
+startup.register("catalog", catalog.start, required=False)
@@ -0,0 +1,94 @@
+import xml.etree.ElementTree as ET
+
+MPD_NAMESPACE = "urn:mpeg:dash:schema:mpd:2011"
+PROFILE = "urn:mpeg:dash:profile:isoff-on-demand:2011"
+
+
+def _range(value):
+    return f"{value['start']}-{value['end']}"
+
+
+def usable_formats(adaptive_formats, max_height=None):
+    """
+    Adaptive formats a DASH player can address with SegmentBase: they need
+    a direct url plus init and index byte ranges. DRC duplicates and
+    non-default dubbed audio tracks are left out.
+    """
+    usable = []
+    for fmt in adaptive_formats:
+        if not fmt.get("url") or "initRange" not in fmt or "indexRange" not in fmt:
+            continue
+        if fmt.get("isDrc") or not fmt.get("audioTrack", {}).get("audioIsDefault", True):
+            continue
+        if max_height and fmt.get("height") and fmt["height"] > max_height:
+            continue
+        usable.append(fmt)
+    return usable
+
+
+def build_mpd(adaptive_formats, duration_seconds):
+    """
+    Static on-demand DASH manifest from YouTube adaptiveFormats.
+
+    One AdaptationSet per (content type, container); representations are
+    listed from lowest to highest bandwidth so players can start on a cheap
+    rendition and switch up. Each representation points at its progressive
+    file with SegmentBase index/init ranges, which is all an on-demand
+    profile player needs to fetch individual segments with Range requests.
+
+    Args:
+        adaptive_formats (list): Format dicts (deciphered url, mimeType, bitrate, initRange, indexRange, ...).
+        duration_seconds (float): Media duration.
+
+    Returns:
+        bytes: The MPD document.
+    """
+    mpd = ET.Element("MPD", {
+        "xmlns": MPD_NAMESPACE,
+        "profiles": PROFILE,
+        "type": "static",
+        "minBufferTime": "PT1.5S",
+        "mediaPresentationDuration": f"PT{float(duration_seconds):.3f}S"
+    })
+    period = ET.SubElement(mpd, "Period", {"start": "PT0S"})
+
+    groups = {}
+    for fmt in adaptive_formats:
+        mime, _, codecs = fmt["mimeType"].partition(";")
+        groups.setdefault(mime.strip(), []).append((fmt, codecs.split("=", 1)[-1].strip().strip('"')))
+
+    # Video sets first, then audio; stable ids so players can remember choices
+    for set_id, mime in enumerate(sorted(groups, key=lambda m: (not m.startswith("video"), m))):
+        content_type = mime.split("/")[0]
+        adaptation = ET.SubElement(period, "AdaptationSet", {
+            "id": str(set_id),
+            "contentType": content_type,
+            "mimeType": mime,
+            "subsegmentAlignment": "true",
+            "startWithSAP": "1"
+        })
+        for fmt, codecs in sorted(groups[mime], key=lambda item: item[0].get("bitrate", 0)):
+            attrs = {
+                "id": str(fmt["itag"]),
+                "codecs": codecs,
+                "bandwidth": str(fmt.get("bitrate") or fmt.get("averageBitrate") or 0)
+            }
+            if content_type == "video":
+                attrs.update({
+                    "width": str(fmt.get("width", 0)),
+                    "height": str(fmt.get("height", 0)),
+                    "frameRate": str(fmt.get("fps", 30))
+                })
+            elif fmt.get("audioSampleRate"):
+                attrs["audioSamplingRate"] = str(fmt["audioSampleRate"])
+            representation = ET.SubElement(adaptation, "Representation", attrs)
+            if content_type == "audio":
+                ET.SubElement(representation, "AudioChannelConfiguration", {
+                    "schemeIdUri": "urn:mpeg:dash:23003:3:audio_channel_configuration:2011",
+                    "value": str(fmt.get("audioChannels", 2))
+                })
+            ET.SubElement(representation, "BaseURL").text = fmt["url"]
+            segment_base = ET.SubElement(representation, "SegmentBase", {"indexRange": _range(fmt["indexRange"])})
+            ET.SubElement(segment_base, "Initialization", {"range": _range(fmt["initRange"])})
+
+    return ET.tostring(mpd, encoding="utf-8", xml_declaration=True)
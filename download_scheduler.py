@@ -0,0 +1,106 @@
+import itertools
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFull(Exception):
+    """The scheduler's admission limit was reached"""
+
+
+class DownloadScheduler:
+    """
+    Fixed worker pool over a priority queue of download jobs.
+
+    Jobs are deduplicated by key (video_id, quality, ...): while a job for a
+    key is queued or running, further submissions attach to it instead of
+    starting another download. ffmpeg_slots caps concurrent ffmpeg processes
+    independently of the worker count, so transfers can overlap encodes.
+    """
+
+    def __init__(self, run_job, workers=4, max_queue=64, ffmpeg_slots=2):
+        self.run_job = run_job
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ffmpeg_slots = threading.BoundedSemaphore(ffmpeg_slots)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._active = {}       # key -> job_id, for queued and running jobs
+        self._pending = 0
+        self._running = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return self
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"download-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, key, create_job, priority="normal"):
+        """
+        Queue a job for key, or attach to the one already in flight.
+
+        Args:
+            key (tuple): Deduplication key; passed to run_job as its arguments.
+            create_job (callable): Returns a new job_id; only called for new jobs.
+            priority (str): "high", "normal" or "low".
+
+        Returns:
+            tuple: (job_id, created)
+
+        Raises:
+            QueueFull: when max_queue jobs are already waiting.
+        """
+        self.start()
+        with self._lock:
+            if key in self._active:
+                self._deduplicated += 1
+                return self._active[key], False
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                raise QueueFull(f"Download queue is full ({self.max_queue} waiting)")
+            job_id = create_job()
+            self._active[key] = job_id
+            self._pending += 1
+        self._queue.put((PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._seq), key, job_id))
+        return job_id, True
+
+    def _work(self):
+        while True:
+            _, _, key, job_id = self._queue.get()
+            with self._lock:
+                self._pending -= 1
+                self._running += 1
+            try:
+                self.run_job(job_id, *key)
+            except Exception as e:
+                logger.error(f"Download job {job_id} crashed: {e}")
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    if self._active.get(key) == job_id:
+                        del self._active[key]
+                self._queue.task_done()
+
+    def describe(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._pending,
+                "running": self._running,
+                "max_queue": self.max_queue,
+                "deduplicated": self._deduplicated,
+                "rejected": self._rejected
+            }
@@ -1,40 +1,194 @@
 import os
-import requests
+import http_pool
+import itertools
 import subprocess
 import tempfile
 import threading
 import uuid
 import time
-import shutil
-import re
-from flask import send_file
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from urllib.parse import quote
+from flask import Response, request, send_file
 from pytubefix import YouTube
-from ytmusicapi import YTMusic
+from lyrics import resolve_lyrics, plain_lyrics
+from ytm_pool import ytmusic
+from download_scheduler import DownloadScheduler, QueueFull
+from artifact_cache import artifact_cache, artifact_key
+import transcode
+import ranged_download
+import startup
+from expiry import expiry
 
-ytmusic = YTMusic()
+logger = logging.getLogger(__name__)
 
 # Job storage
 DOWNLOAD_JOBS = {}
-CLEANUP_INTERVAL = 300      # check every 5 min
-JOB_EXPIRY = 600            # remove jobs older than 10 min
+_JOBS_LOCK = threading.Lock()   # serializes update_job; ranged chunks report from several threads
+JOB_EXPIRY = 600            # finished jobs are forgotten 10 min after they end
+MAX_JOBS = int(os.environ.get("MUSICANA_MAX_JOBS", 5000))              # finished jobs kept at most
+DOWNLOAD_WORKERS = int(os.environ.get("MUSICANA_DOWNLOAD_WORKERS", 4))
+DOWNLOAD_QUEUE = int(os.environ.get("MUSICANA_DOWNLOAD_QUEUE", 64))     # waiting jobs before 429
+FFMPEG_SLOTS = int(os.environ.get("MUSICANA_FFMPEG_SLOTS", 2))          # concurrent ffmpeg processes
+# Metadata, lyrics and cover are fetched next to the audio transfer; once the
+# audio is in, ffmpeg waits at most this long for each before going without it
+METADATA_WAIT = 5
+LYRICS_WAIT = 2
+COVER_WAIT = 5
+# How finished files leave the process: "" (Flask streams them), "x-accel"
+# (nginx serves the artifact from an internal location at ACCEL_PREFIX) or
+# "x-sendfile" (Apache/lighttpd; enabled through Flask's USE_X_SENDFILE)
+SENDFILE_MODE = os.environ.get("MUSICANA_SENDFILE", "").lower()
+ACCEL_PREFIX = os.environ.get("MUSICANA_ACCEL_PREFIX", "/_artifacts/")
+STREAM_SLOT_TIMEOUT = 10    # seconds a streaming download waits for an ffmpeg slot
+EVENT_INTERVAL = 0.5        # minimum seconds between pushed updates on one stream
+PRIVATE_FIELDS = ("file", "tmpdir", "timestamp")    # never pushed to clients
+PIPE_CHUNK = 64 * 1024
+
+
+class JobWatchers:
+    """
+    Wakes progress streams when a job they watch changes.
+
+    Each stream owns one Event registered under every job id it follows, so
+    a progress tick only wakes the streams interested in that job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watchers = {}     # job_id -> set of Events
+
+    def subscribe(self, job_ids):
+        event = threading.Event()
+        with self._lock:
+            for job_id in job_ids:
+                self._watchers.setdefault(job_id, set()).add(event)
+        return event
+
+    def unsubscribe(self, job_ids, event):
+        with self._lock:
+            for job_id in job_ids:
+                watchers = self._watchers.get(job_id)
+                if watchers:
+                    watchers.discard(event)
+                    if not watchers:
+                        del self._watchers[job_id]
+
+    def publish(self, job_id):
+        with self._lock:
+            for event in self._watchers.get(job_id, ()):
+                event.set()
+
+    def count(self):
+        with self._lock:
+            return len({event for events in self._watchers.values() for event in events})
+
+
+job_watchers = JobWatchers()
+
+
+def update_job(job_id, **fields):
+    """Apply fields to a job and wake its watchers if anything changed; progress never goes back"""
+    with _JOBS_LOCK:
+        job = DOWNLOAD_JOBS.get(job_id)
+        if job is None:
+            return
+        if "progress" in fields and job.get("progress") is not None:
+            fields["progress"] = max(job["progress"], fields["progress"])
+        if not any(job.get(name) != value for name, value in fields.items()):
+            return
+        finishing = fields.get("status") in ("completed", "failed") and job["status"] != fields["status"]
+        job.update(fields)
+        job_watchers.publish(job_id)
+    if finishing:
+        expiry.schedule("job", job_id, JOB_EXPIRY)
+        if job.get("tmpdir"):
+            expiry.remove_dir(job["tmpdir"])    # the result already lives in the artifact cache
+
+
+def job_updates(job_ids, min_interval=EVENT_INTERVAL, heartbeat=15):
+    """
+    Yield (job_id, changed_fields) as watched jobs change, or None as a
+    keep-alive after heartbeat idle seconds. The first update per job is its
+    full public state; later ones carry only changed fields. Bursts are
+    coalesced to at most one round per min_interval. Ends once every job has
+    completed, failed or is unknown.
+    """
+    event = job_watchers.subscribe(job_ids)
+    sent = {}
+    live = list(dict.fromkeys(job_ids))
+    try:
+        while live:
+            event.clear()       # before reading, so a concurrent update re-arms it
+            for job_id in list(live):
+                job = DOWNLOAD_JOBS.get(job_id)
+                if job is None:
+                    live.remove(job_id)
+                    yield job_id, {"status": "not_found"}
+                    continue
+                last = sent.setdefault(job_id, {})
+                changed = {name: value for name, value in list(job.items())
+                           if name not in PRIVATE_FIELDS and (name not in last or last[name] != value)}
+                if changed:
+                    last.update(changed)
+                    yield job_id, changed
+                if job["status"] in ("completed", "failed"):
+                    live.remove(job_id)
+            if not live:
+                break
+            if not event.wait(heartbeat):
+                yield None
+                continue
+            time.sleep(min_interval)
+    finally:
+        job_watchers.unsubscribe(job_ids, event)
+
+
+side_fetches = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS * 3, thread_name_prefix="download-side")
+
+
+def fetch_lyrics(video_id, get_song=None):
+    """Fetch lyrics via the shared lyrics store (Lyrica on a miss)"""
+    try:
+        _, _, data = resolve_lyrics(video_id, get_song or ytmusic.get_song, timeout=10)
+        return plain_lyrics(data)
+    except Exception:
+        return ""
 
 
-def fetch_lyrics(video_id):
-    """Fetch lyrics from local Lyrica API"""
+def album_name(song_meta):
+    """Album (category) from a get_song response, falling back to the video title"""
     try:
-        song = ytmusic.get_song(video_id)
-        title = song.get("videoDetails", {}).get("title", "")
-        artist = song.get("videoDetails", {}).get("author", "")
-
-        lyrica_url = f"http://127.0.0.1:9999/lyrics/?artist={artist}&song={title}"
-        r = requests.get(lyrica_url, timeout=10)
-        if r.status_code == 200:
-            data = r.json()
-            if "data" in data and "lyrics" in data["data"]:
-                return data["data"]["lyrics"]
-        return ""
+        album = song_meta.get("microformat", {}).get("microformatDataRenderer", {}).get("category", "")
+        if not album:
+            album = song_meta.get("videoDetails", {}).get("title", "")
+        return album
     except Exception:
-        return ""
+        return "Unknown"
+
+
+def fetch_cover(url, path):
+    """Download cover art; the file only appears once it is complete"""
+    with http_pool.get(url, stream=True, timeout=(5, 15)) as r:
+        if r.status_code != 200:
+            return None
+        with open(path + ".part", "wb") as f:
+            for chunk in r.iter_content(1024):
+                f.write(chunk)
+    os.replace(path + ".part", path)
+    return path
+
+
+def join_side_fetch(job_id, what, future, timeout, default):
+    """Result of a side fetch, or default if it failed or is still running"""
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        logger.info(f"Job {job_id}: {what} not ready {timeout}s after the audio; going without it")
+    except Exception as e:
+        logger.warning(f"Job {job_id}: {what} fetch failed: {e}")
+    return default
 
 
 def on_progress(stream, chunk, bytes_remaining, job_id):
@@ -45,11 +199,57 @@ def on_progress(stream, chunk, bytes_remaining, job_id):
     total_size = stream.filesize
     bytes_downloaded = total_size - bytes_remaining
     percent = int(bytes_downloaded * 100 / total_size)
-    job["progress"] = percent // 2  # download is half (0–50)
+    update_job(job_id, progress=percent // 2)  # download is half (0–50)
 
 
-def process_download(job_id, video_id, quality):
+def fetch_audio(job_id, stream, raw_file):
+    """Parallel ranged download, falling back to pytubefix's single connection"""
+    def on_range_progress(done, total):
+        update_job(job_id, progress=int(done * 100 / total) // 2)  # download is half (0–50)
+
+    size = stream.filesize
+    if size:
+        try:
+            ranged_download.download(stream.url, raw_file, size, on_progress=on_range_progress)
+            return
+        except Exception as e:
+            logger.warning(f"Ranged download failed for job {job_id}, falling back: {e}")
+    stream.download(output_path=os.path.dirname(raw_file), filename=os.path.basename(raw_file))
+
+
+def complete_job(job_id, artifact, cached=False):
+    """Mark a job completed, pointing at a cached artifact"""
+    update_job(
+        job_id,
+        status="completed",
+        progress=100,
+        file=artifact["path"],
+        download_name=artifact["name"],
+        sha256=artifact["sha256"],
+        size=artifact["size"],
+        cached=cached
+    )
+
+
+def select_stream(yt, quality, fmt):
+    """Pick an audio stream for quality, preferring the target format's native container"""
+    streams = yt.streams.filter(only_audio=True, file_extension=transcode.TARGETS[fmt]["source_ext"])
+    if not streams:
+        streams = yt.streams.filter(only_audio=True, file_extension="mp4")
+    streams = streams.order_by("abr").desc()
+    if not streams:
+        raise Exception("No audio streams found")
+
+    if quality == "low":
+        return min(streams, key=lambda s: int(s.abr.replace("kbps", "")) if s.abr else 999)
+    elif quality == "medium":
+        return min(streams, key=lambda s: abs(128 - (int(s.abr.replace("kbps", "")) if s.abr else 128)))
+    return streams.first()  # high/best
+
+
+def process_download(job_id, video_id, quality, fmt="m4a"):
     """Background worker for downloading and embedding metadata"""
+    update_job(job_id, status="processing")
     try:
         yt = YouTube(f"https://www.youtube.com/watch?v={video_id}",
                      on_progress_callback=lambda s, c, r: on_progress(s, c, r, job_id))
@@ -57,112 +257,232 @@ def process_download(job_id, video_id, quality):
         artist = yt.author or "Unknown"
         cover_url = yt.thumbnail_url
 
-        # Album from YTMusic
-        song_meta = ytmusic.get_song(video_id)
-        album = ""
-        try:
-            album = song_meta.get("microformat", {}).get("microformatDataRenderer", {}).get("category", "")
-            if not album:
-                album = song_meta.get("videoDetails", {}).get("title", "")
-        except Exception:
-            album = "Unknown"
-
-        # Lyrics
-        lyrics = fetch_lyrics(video_id)
-
         tmpdir = tempfile.mkdtemp()
-        raw_file = os.path.join(tmpdir, "audio.mp4")
-        final_file = os.path.join(tmpdir, f"{title}.m4a")
+        DOWNLOAD_JOBS[job_id]["tmpdir"] = tmpdir
+        target = transcode.TARGETS[fmt]
+        final_file = os.path.join(tmpdir, f"{title.replace(os.sep, '_')}.{target['ext']}")
         cover_file = os.path.join(tmpdir, "cover.jpg")
 
-        # Step 1: select stream based on quality
-        streams = yt.streams.filter(only_audio=True, file_extension="mp4").order_by("abr").desc()
-        if not streams:
-            raise Exception("No audio streams found")
-
-        if quality == "low":
-            stream = min(streams, key=lambda s: int(s.abr.replace("kbps", "")) if s.abr else 999)
-        elif quality == "medium":
-            stream = min(streams, key=lambda s: abs(128 - (int(s.abr.replace("kbps", "")) if s.abr else 128)))
-        else:  # high/best
-            stream = streams.first()
-
-        stream.download(output_path=tmpdir, filename="audio.mp4")
-
-        # Step 2: download cover
-        if cover_url:
-            r = requests.get(cover_url, stream=True)
-            if r.status_code == 200:
-                with open(cover_file, "wb") as f:
-                    for chunk in r.iter_content(1024):
-                        f.write(chunk)
-
-        # Step 3: ffmpeg embed metadata
-        cmd = ["ffmpeg", "-y", "-i", raw_file]
-        if os.path.exists(cover_file):
-            cmd += [
-                "-i", cover_file,
-                "-map", "0:a", "-map", "1:v",
-                "-c:a", "aac", "-c:v", "png",
-                "-disposition:v:0", "attached_pic",
-            ]
-        else:
-            cmd += ["-c:a", "aac", "-vn"]
-
-        cmd += [
-            "-metadata", f"title={title}",
-            "-metadata", f"artist={artist}",
-            "-metadata", f"album={album}",
-            "-metadata", f"lyrics={lyrics}",
-            "-metadata", "comment=Downloaded via API",
-            final_file
-        ]
-
-        process = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True)
-
-        # Track FFmpeg conversion progress
-        duration = None
-        for line in process.stderr:
-            if "Duration" in line:
-                match = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", line)
-                if match:
-                    h, m, s = map(float, match.groups())
-                    duration = h * 3600 + m * 60 + s
-            if "time=" in line and duration:
-                match = re.search(r"time=(\d+):(\d+):(\d+\.\d+)", line)
-                if match:
-                    h, m, s = map(float, match.groups())
-                    current = h * 3600 + m * 60 + s
-                    percent = int((current / duration) * 50)
-                    DOWNLOAD_JOBS[job_id]["progress"] = 50 + percent
-
-        process.wait()
-
-        DOWNLOAD_JOBS[job_id]["status"] = "completed"
-        DOWNLOAD_JOBS[job_id]["progress"] = 100
-        DOWNLOAD_JOBS[job_id]["file"] = final_file
-        DOWNLOAD_JOBS[job_id]["tmpdir"] = tmpdir
+        # Album (YTMusic), lyrics and cover run while the audio transfers.
+        # Lyrics reuse the album lookup's get_song response instead of calling it again.
+        song_meta = side_fetches.submit(ytmusic.get_song, video_id)
+        lyrics = side_fetches.submit(fetch_lyrics, video_id, lambda _: song_meta.result())
+        cover = side_fetches.submit(fetch_cover, cover_url, cover_file) \
+            if cover_url and target["cover"] else None
+
+        # Step 1: select stream based on quality and target format
+        stream = select_stream(yt, quality, fmt)
+        raw_file = os.path.join(tmpdir, f"audio.{stream.subtype}")
+        fetch_audio(job_id, stream, raw_file)
+
+        # Step 2: join the side fetches; none of them may hold up the file for long
+        album = album_name(join_side_fetch(job_id, "metadata", song_meta, METADATA_WAIT, {}))
+        lyrics = join_side_fetch(job_id, "lyrics", lyrics, LYRICS_WAIT, "")
+        if cover:
+            join_side_fetch(job_id, "cover", cover, COVER_WAIT, None)
+
+        # Step 3: ffmpeg embed metadata; stream copy when the codec already fits
+        source_codec = transcode.probe_codec(raw_file, fallback=stream.audio_codec)
+        cmd, mode = transcode.build_command(raw_file, final_file, fmt, source_codec, cover_file, {
+            "title": title,
+            "artist": artist,
+            "album": album,
+            "lyrics": lyrics,
+            "comment": "Downloaded via API"
+        })
+
+        def on_ffmpeg_progress(fraction):
+            update_job(job_id, progress=50 + int(fraction * 50))
+
+        with scheduler.ffmpeg_slots:
+            returncode, duration, cpu_seconds = transcode.run_ffmpeg(cmd, on_ffmpeg_progress)
+        if returncode != 0:
+            raise Exception(f"ffmpeg exited with code {returncode}")
+
+        update_job(
+            job_id,
+            source_codec=source_codec,
+            mode=mode,
+            cpu_seconds=round(cpu_seconds, 3) if cpu_seconds is not None else None,
+            cpu_seconds_saved=transcode.record(mode, duration or yt.length, cpu_seconds)
+        )
+
+        # Keep the result for future requests; the job serves it from the cache
+        artifact = artifact_cache.store(artifact_key(video_id, quality, fmt), final_file,
+                                        os.path.basename(final_file))
+        complete_job(job_id, artifact)
     except Exception as e:
-        DOWNLOAD_JOBS[job_id]["status"] = "failed"
-        DOWNLOAD_JOBS[job_id]["error"] = str(e)
-
-
-def start_async_download(video_id, quality="high"):
-    """Start a background download job and return job_id"""
-    job_id = str(uuid.uuid4())
-    DOWNLOAD_JOBS[job_id] = {
-        "status": "processing",
-        "progress": 0,
-        "file": None,
-        "error": None,
-        "timestamp": time.time(),
-        "tmpdir": None
-    }
-    thread = threading.Thread(target=process_download, args=(job_id, video_id, quality))
-    thread.start()
+        update_job(job_id, status="failed", error=str(e))
+
+
+scheduler = DownloadScheduler(
+    process_download,
+    workers=DOWNLOAD_WORKERS,
+    max_queue=DOWNLOAD_QUEUE,
+    ffmpeg_slots=FFMPEG_SLOTS
+)
+
+
+def start_async_download(video_id, quality="high", priority="normal", fmt="m4a"):
+    """
+    Queue a download job and return its job_id.
+    Concurrent requests for the same video, quality and format share one job.
+    Raises QueueFull when the admission limit is reached.
+    """
+    def create_job():
+        job_id = str(uuid.uuid4())
+        DOWNLOAD_JOBS[job_id] = {
+            "status": "queued",
+            "progress": 0,
+            "file": None,
+            "error": None,
+            "timestamp": time.time(),
+            "tmpdir": None,
+            "format": fmt,
+            "mimetype": transcode.TARGETS[fmt]["mimetype"]
+        }
+        return job_id
+
+    # Already built once: complete instantly, no upstream or ffmpeg work
+    artifact = artifact_cache.lookup(artifact_key(video_id, quality, fmt))
+    if artifact:
+        job_id = create_job()
+        complete_job(job_id, artifact, cached=True)
+        return job_id
+
+    job_id, _ = scheduler.submit((video_id, quality, fmt), create_job, priority)
     return job_id
 
 
+def _read_file(path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(PIPE_CHUNK), b""):
+            yield chunk
+
+
+def _open_source(stream):
+    """
+    Start the upstream fetch for stream_download.
+
+    The first bytes are read here, so an upstream that fails outright raises
+    to the caller rather than inside the feeder thread.
+
+    Returns:
+        tuple: (chunks, close) where close() releases the upstream connection
+    """
+    if stream.filesize:
+        chunks = ranged_download.stream(stream.url, stream.filesize)
+        first = next(chunks, b"")
+        return itertools.chain([first], chunks), chunks.close
+    response = http_pool.get(stream.url, stream=True, timeout=(5, 30))
+    try:
+        response.raise_for_status()
+        chunks = response.iter_content(PIPE_CHUNK)
+        first = next(chunks, b"")
+    except Exception:
+        response.close()
+        raise
+    return itertools.chain([first], chunks), response.close
+
+
+def _feed(process, source, close, failed):
+    """Copy upstream bytes into ffmpeg's stdin until the source ends or ffmpeg goes away"""
+    try:
+        for data in source:
+            process.stdin.write(data)
+    except (BrokenPipeError, ValueError):
+        pass                # ffmpeg exited or the client disconnected
+    except Exception as e:
+        logger.warning(f"Streaming download feed failed: {e}")
+        failed.set()
+        # Kill before stdin closes, or ffmpeg would finish the truncated input cleanly
+        process.kill()
+    finally:
+        close()
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+
+def stream_download(video_id, quality="high", fmt="m4a"):
+    """
+    Pipe a song straight from upstream through ffmpeg to the client.
+
+    A feeder thread writes the ranged upstream fetch into ffmpeg's stdin and
+    the returned generator yields ffmpeg's stdout (fragmented MP4 or Ogg) as
+    it is produced, so no intermediate file is written. Already cached
+    artifacts are streamed from the cache instead. If upstream breaks off
+    mid-transfer the generator raises, so the client sees an aborted
+    response rather than a truncated file.
+
+    Returns:
+        tuple: (chunks, download_name, mimetype)
+
+    Raises:
+        QueueFull: when no ffmpeg slot frees up within STREAM_SLOT_TIMEOUT.
+    """
+    target = transcode.TARGETS[fmt]
+    artifact = artifact_cache.lookup(artifact_key(video_id, quality, fmt))
+    if artifact:
+        return _read_file(artifact["path"]), artifact["name"], target["mimetype"]
+
+    yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+    title = yt.title
+    stream = select_stream(yt, quality, fmt)
+    source_codec = transcode.normalize_codec(stream.audio_codec)
+    cmd, mode = transcode.build_stream_command(fmt, source_codec, {
+        "title": title,
+        "artist": yt.author or "Unknown",
+        "comment": "Downloaded via API"
+    })
+
+    if not scheduler.ffmpeg_slots.acquire(timeout=STREAM_SLOT_TIMEOUT):
+        raise QueueFull("No ffmpeg slot available for streaming")
+    try:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+    except Exception:
+        scheduler.ffmpeg_slots.release()
+        raise
+    try:
+        source, close = _open_source(stream)
+    except Exception:
+        # Upstream failed before anything was fed: give back the slot and the process
+        process.kill()
+        process.stdin.close()
+        process.stdout.close()
+        transcode.reap(process)
+        scheduler.ffmpeg_slots.release()
+        raise
+    failed = threading.Event()
+    threading.Thread(target=_feed, args=(process, source, close, failed), daemon=True).start()
+
+    def pipe():
+        finished = False
+        try:
+            yield b""       # primed below, so close() always reaches the cleanup
+            for chunk in iter(lambda: process.stdout.read1(PIPE_CHUNK), b""):
+                yield chunk
+            finished = True
+        finally:
+            process.stdout.close()
+            if not finished:
+                process.kill()      # the client went away mid-stream
+            returncode, cpu_seconds = transcode.reap(process)
+            scheduler.ffmpeg_slots.release()
+            if returncode == 0 and not failed.is_set():
+                transcode.record(mode, yt.length, cpu_seconds)
+        if returncode != 0 or failed.is_set():
+            # Break the response off rather than end a truncated file with a clean 200
+            raise RuntimeError(f"Streaming download of {video_id} failed (ffmpeg code {returncode})")
+
+    chunks = pipe()
+    next(chunks)
+    name = f"{title.replace(os.sep, '_')}.{target['ext']}"
+    return chunks, name, target["mimetype"]
+
+
 def get_download_status(job_id):
     """Check job status"""
     job = DOWNLOAD_JOBS.get(job_id)
@@ -171,37 +491,44 @@ def get_download_status(job_id):
     return job
 
 
+def accel_redirect(job, download_name):
+    """Empty response telling nginx to serve the artifact itself (sendfile, Range)"""
+    relative = os.path.relpath(job["file"], artifact_cache.directory).replace(os.sep, "/")
+    response = Response(mimetype=job.get("mimetype", "audio/mp4"))
+    response.headers["X-Accel-Redirect"] = ACCEL_PREFIX.rstrip("/") + "/" + quote(relative)
+    response.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    if job.get("sha256"):
+        response.set_etag(job["sha256"])
+    return response.make_conditional(request)
+
+
 def get_download_file(job_id):
-    """Return file if ready"""
+    """
+    Return file if ready.
+    Conditional and Range requests are answered (304/206) with the artifact
+    hash as the ETag, so interrupted downloads resume instead of restarting.
+    """
     job = DOWNLOAD_JOBS.get(job_id)
     if not job or job["status"] != "completed":
         return None
+    if not os.path.exists(job["file"]):     # evicted from the artifact cache since
+        return None
+    download_name = job.get("download_name") or os.path.basename(job["file"])
+    if SENDFILE_MODE == "x-accel":
+        return accel_redirect(job, download_name)
     return send_file(
         job["file"],
         as_attachment=True,
-        download_name=os.path.basename(job["file"]),
-        mimetype="audio/m4a"
+        download_name=download_name,
+        mimetype=job.get("mimetype", "audio/mp4"),
+        etag=job.get("sha256") or True,
+        conditional=True
     )
 
 
-def cleanup_old_jobs():
-    """Background cleanup of old jobs"""
-    while True:
-        now = time.time()
-        expired = [jid for jid, job in DOWNLOAD_JOBS.items()
-                   if now - job["timestamp"] > JOB_EXPIRY and job["status"] in ["completed", "failed"]]
-
-        for jid in expired:
-            job = DOWNLOAD_JOBS[jid]
-            if job.get("tmpdir") and os.path.exists(job["tmpdir"]):
-                try:
-                    shutil.rmtree(job["tmpdir"])
-                except Exception:
-                    pass
-            del DOWNLOAD_JOBS[jid]
-
-        time.sleep(CLEANUP_INTERVAL)
+def expire_job(job_id):
+    DOWNLOAD_JOBS.pop(job_id, None)
 
 
-# Start cleanup thread
-threading.Thread(target=cleanup_old_jobs, daemon=True).start()
+expiry.register("job", expire_job, max_entries=MAX_JOBS)
+startup.register("download_workers", scheduler.start)
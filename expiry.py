@@ -0,0 +1,137 @@
+import heapq
+import itertools
+import queue
+import shutil
+import threading
+import time
+import logging
+from collections import OrderedDict
+import startup
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """
+    One timer for everything that expires: finished download jobs, up-next
+    sessions and temporary directories.
+
+    Deadlines sit in a min-heap of (deadline, seq, kind, key), so scheduling
+    is O(log n) and the timer sleeps exactly until the next one is due.
+    Rescheduling or cancelling only updates the live entry for the key; the
+    old heap entry is skipped when popped and the heap is compacted once
+    stale entries dominate. Each kind can have a cap: past it, the entries
+    scheduled longest ago are expired immediately.
+
+    Expiry handlers (dict deletes, rmtree) run on a separate cleanup thread,
+    so neither callers nor the timer ever wait on the filesystem.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._entries = {}      # kind -> OrderedDict(key -> (seq, deadline)), oldest first
+        self._handlers = {}
+        self._caps = {}
+        self._cond = threading.Condition()
+        self._cleanup = queue.Queue()
+        self._threads = []
+        self.expired = 0
+        self.evicted = 0
+
+    def register(self, kind, on_expire, max_entries=None):
+        """Declare a kind of entry; on_expire(key) runs on the cleanup thread"""
+        with self._cond:
+            self._handlers[kind] = on_expire
+            self._caps[kind] = max_entries
+            self._entries.setdefault(kind, OrderedDict())
+
+    def start(self):
+        """Start the timer and cleanup threads (idempotent)"""
+        with self._cond:
+            if self._threads:
+                return self
+            for name, target in (("expiry-timer", self._run_timer), ("expiry-cleanup", self._run_cleanup)):
+                thread = threading.Thread(target=target, name=name, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def schedule(self, kind, key, ttl):
+        """Expire key after ttl seconds, replacing any earlier deadline for it"""
+        self.start()
+        deadline = time.monotonic() + ttl
+        evicted = []
+        with self._cond:
+            entries = self._entries[kind]
+            seq = next(self._seq)
+            entries[key] = (seq, deadline)
+            entries.move_to_end(key)
+            heapq.heappush(self._heap, (deadline, seq, kind, key))
+
+            cap = self._caps[kind]
+            while cap is not None and len(entries) > cap:
+                evicted.append(entries.popitem(last=False)[0])
+            self.evicted += len(evicted)
+
+            if len(self._heap) > 2 * self._live() + 1024:
+                self._compact()
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+        for old_key in evicted:
+            self._cleanup.put((kind, old_key))
+
+    def cancel(self, kind, key):
+        """Forget key without running its handler"""
+        with self._cond:
+            self._entries[kind].pop(key, None)
+
+    def remove_dir(self, path, delay=0):
+        """rmtree path on the cleanup thread after delay seconds"""
+        self.schedule("tmpdir", path, delay)
+
+    def _live(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _compact(self):
+        self._heap = [(deadline, seq, kind, key)
+                      for kind, entries in self._entries.items()
+                      for key, (seq, deadline) in entries.items()]
+        heapq.heapify(self._heap)
+
+    def _run_timer(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, seq, kind, key = heapq.heappop(self._heap)
+                    entries = self._entries[kind]
+                    entry = entries.get(key)
+                    if entry and entry[0] == seq:       # not rescheduled or cancelled since
+                        del entries[key]
+                        self.expired += 1
+                        self._cleanup.put((kind, key))
+                self._cond.wait(self._heap[0][0] - now if self._heap else None)
+
+    def _run_cleanup(self):
+        while True:
+            kind, key = self._cleanup.get()
+            try:
+                self._handlers[kind](key)
+            except Exception as e:
+                logger.warning(f"Expiring {kind} {key} failed: {e}")
+
+    def stats(self):
+        with self._cond:
+            return {
+                "scheduled": {kind: len(entries) for kind, entries in self._entries.items()},
+                "heap": len(self._heap),
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "cleanup_backlog": self._cleanup.qsize()
+            }
+
+
+expiry = ExpiryScheduler()
+expiry.register("tmpdir", lambda path: shutil.rmtree(path, ignore_errors=True))
+startup.register("expiry", expiry.start)
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Defaults for every outbound host; override per host with configure()
+DEFAULT_TIMEOUT = (5, 30)   # (connect, read) seconds
+POOL_MAXSIZE = int(os.environ.get("MUSICANA_HTTP_POOL", 16))
+RETRIES = int(os.environ.get("MUSICANA_HTTP_RETRIES", 3))
+BACKOFF_FACTOR = 0.3
+BACKOFF_JITTER = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_HOSTS = 64              # sessions kept; the least recently used is closed beyond this
+# Hosts under these domains share one session and metrics entry: googlevideo
+# hands out a different edge host for nearly every stream URL.
+SHARED_DOMAINS = ("googlevideo.com",)
+SHARED_POOLS = 16           # per-edge connection pools kept inside a shared session
+
+_sessions = OrderedDict()
+_overrides = {}
+_metrics = OrderedDict()
+_lock = threading.Lock()
+
+
+def _host(url):
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url
+    hostname = parts.hostname or ""
+    for domain in SHARED_DOMAINS:
+        if hostname.endswith("." + domain):
+            return f"{parts.scheme}://*.{domain}"
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _record(host, elapsed, status=None, retries=0, error=False):
+    with _lock:
+        m = _metrics.setdefault(host, {
+            "requests": 0, "errors": 0, "retries": 0,
+            "status": {}, "total_time": 0.0, "max_time": 0.0
+        })
+        m["requests"] += 1
+        m["retries"] += retries
+        m["total_time"] += elapsed
+        m["max_time"] = max(m["max_time"], elapsed)
+        if error:
+            m["errors"] += 1
+        if status is not None:
+            m["status"][status] = m["status"].get(status, 0) + 1
+        _metrics.move_to_end(host)
+        if len(_metrics) > MAX_HOSTS:
+            _metrics.popitem(last=False)
+
+
+def _make_retry(total):
+    kwargs = dict(
+        total=total,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=BACKOFF_JITTER, **kwargs)
+    except TypeError:   # urllib3 < 2 has no jitter support
+        return Retry(**kwargs)
+
+
+class PooledSession(requests.Session):
+    """requests.Session with a default timeout and per-host metrics"""
+
+    def __init__(self, host, timeout):
+        super().__init__()
+        self.host = host
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            _record(self.host, time.perf_counter() - start, error=True)
+            raise
+        history = getattr(getattr(response.raw, "retries", None), "history", None) or ()
+        _record(self.host, time.perf_counter() - start, response.status_code, len(history),
+                error=response.status_code >= 500)
+        return response
+
+
+def configure(url, pool_maxsize=None, retries=None, timeout=None):
+    """Set per-host pool options; must run before the host's first request"""
+    with _lock:
+        _overrides[_host(url)] = {"pool_maxsize": pool_maxsize, "retries": retries, "timeout": timeout}
+
+
+def session_for(url):
+    """Shared keep-alive session for the URL's scheme+host, created on first use"""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is not None:
+            _sessions.move_to_end(host)
+            return session
+        opts = _overrides.get(host, {})
+        pool_maxsize = opts.get("pool_maxsize") or POOL_MAXSIZE
+        retries = RETRIES if opts.get("retries") is None else opts["retries"]
+        session = PooledSession(host, opts.get("timeout") or DEFAULT_TIMEOUT)
+        adapter = HTTPAdapter(
+            pool_connections=SHARED_POOLS if "*" in host else 1,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=_make_retry(retries)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sessions[host] = session
+        while len(_sessions) > MAX_HOSTS:
+            evicted_host, evicted = _sessions.popitem(last=False)
+            evicted.close()
+            logger.debug(f"Closed idle HTTP session for {evicted_host}")
+        return session
+
+
+def request(method, url, **kwargs):
+    return session_for(url).request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    """Drop-in for requests.get that reuses pooled connections"""
+    return session_for(url).get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    return session_for(url).head(url, **kwargs)
+
+
+def metrics():
+    """Per-host request counts, errors, retries, status codes and latency"""
+    with _lock:
+        snapshot = {}
+        for host, m in _metrics.items():
+            snapshot[host] = dict(
+                m,
+                status=dict(m["status"]),
+                avg_time=round(m["total_time"] / m["requests"], 4) if m["requests"] else 0.0,
+                total_time=round(m["total_time"], 3),
+                max_time=round(m["max_time"], 3)
+            )
+        return snapshot
@@ -0,0 +1,360 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from ytm_pool import ytmusic
+import startup
+
+logger = logging.getLogger(__name__)
+
+# The library is mirrored into SQLite by a background thread. Each pass only
+# reads the newest RECENT_WINDOW entries and diffs them against the mirror;
+# a full re-read (which also catches removals) runs every FULL_SYNC_INTERVAL
+# or when the window no longer overlaps what is stored.
+ENABLED = os.environ.get("MUSICANA_LIBRARY_MIRROR", "1") not in ("0", "false", "no")
+DB_PATH = os.environ.get("MUSICANA_LIBRARY_DB", os.path.join("data", "library.db"))
+SYNC_INTERVAL = int(os.environ.get("MUSICANA_LIBRARY_SYNC", 900))
+FULL_SYNC_INTERVAL = int(os.environ.get("MUSICANA_LIBRARY_FULL_SYNC", 6 * 3600))
+RECENT_WINDOW = 100
+RETRY_DELAY = 60             # first retry after a failed pass; doubles up to the sync interval
+
+SORTS = {
+    "relevance": "bm25(songs_fts)",
+    "recent": "s.seq",
+    "title": "s.title COLLATE NOCASE",
+    "artist": "s.artists COLLATE NOCASE",
+    "album": "s.album COLLATE NOCASE",
+    "duration": "s.duration_seconds",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT,
+    artists TEXT,
+    album TEXT,
+    duration TEXT,
+    duration_seconds INTEGER,
+    payload TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    UNIQUE (kind, video_id)
+);
+CREATE INDEX IF NOT EXISTS songs_kind_seq ON songs (kind, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts USING fts5(
+    title, artists, album, content='songs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS songs_ai AFTER INSERT ON songs BEGIN
+    INSERT INTO songs_fts (rowid, title, artists, album) VALUES (new.id, new.title, new.artists, new.album);
+END;
+CREATE TRIGGER IF NOT EXISTS songs_ad AFTER DELETE ON songs BEGIN
+    INSERT INTO songs_fts (songs_fts, rowid, title, artists, album)
+    VALUES ('delete', old.id, old.title, old.artists, old.album);
+END;
+CREATE TRIGGER IF NOT EXISTS songs_au AFTER UPDATE ON songs BEGIN
+    INSERT INTO songs_fts (songs_fts, rowid, title, artists, album)
+    VALUES ('delete', old.id, old.title, old.artists, old.album);
+    INSERT INTO songs_fts (rowid, title, artists, album) VALUES (new.id, new.title, new.artists, new.album);
+END;
+CREATE TABLE IF NOT EXISTS playlists (
+    playlist_id TEXT PRIMARY KEY,
+    title TEXT,
+    track_count INTEGER,
+    thumbnails TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    kind TEXT PRIMARY KEY,
+    full_at REAL,
+    synced_at REAL
+);
+"""
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 prefix query: every word must match, the last as a prefix"""
+    words = ["".join(c for c in word if c.isalnum()) for word in (text or "").split()]
+    words = [w for w in words if w]
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+
+def _like(text):
+    """LIKE pattern matching text anywhere, with its own % and _ taken literally"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _plain_track(song):
+    return {
+        "title": song.get("title", ""),
+        "videoId": song["videoId"],
+        "artists": [a.get("name", "") for a in song.get("artists") or [] if isinstance(a, dict)],
+        "album": (song.get("album") or {}).get("name", "") if isinstance(song.get("album"), dict) else "",
+        "duration": song.get("duration", ""),
+        "thumbnails": [t["url"] for t in song.get("thumbnails") or [] if isinstance(t, dict) and t.get("url")]
+    }
+
+
+class LibraryMirror:
+    """
+    SQLite mirror of the signed-in user's library songs, uploads and playlists.
+
+    Songs and uploads keep a monotonically increasing seq, so "recently added"
+    order survives incremental passes that only insert the new head of the
+    list. Titles, artists and albums are indexed with FTS5 for search.
+    Playlists are few and cheap to list, so every pass replaces them whole.
+    Tracks are stored already formatted by format_track, so reads return
+    them as-is.
+    """
+
+    def __init__(self, path=DB_PATH, interval=SYNC_INTERVAL, full_interval=FULL_SYNC_INTERVAL,
+                 window=RECENT_WINDOW, format_track=None, on_change=None):
+        self.path = path
+        self.interval = interval
+        self.full_interval = full_interval
+        self.window = window
+        self.format_track = format_track or _plain_track
+        self.on_change = on_change
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.syncs = 0
+        self.full_syncs = 0
+        self.last_error = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    # --- Sync ---
+
+    def start(self):
+        """Start the background sync thread (first pass runs immediately)"""
+        if not ytmusic.authenticated:
+            # Guest mode has no library; reads keep going upstream
+            raise RuntimeError("no signed-in identity to mirror")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="library-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def refresh_soon(self):
+        """Wake the sync thread early, e.g. after a library mutation"""
+        self._wake.set()
+
+    def _run(self):
+        failures = 0
+        while True:
+            try:
+                self.sync()
+                self.last_error = None
+                failures = 0
+                delay = self.interval
+            except Exception as e:
+                self.last_error = str(e)
+                failures += 1
+                delay = min(RETRY_DELAY * 2 ** (failures - 1), self.interval)
+                logger.warning(f"Library sync failed ({failures} in a row, retrying in {delay}s): {e}")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def sync(self):
+        """One sync pass over songs, uploads and playlists; returns True if anything changed"""
+        with self._sync_lock:
+            changed = self._sync_songs("song", ytmusic.get_library_songs)
+            changed |= self._sync_songs("upload", ytmusic.get_library_upload_songs)
+            changed |= self._sync_playlists()
+            self.syncs += 1
+        if changed and self.on_change:
+            self.on_change()
+        return changed
+
+    def _state(self, kind):
+        row = self._conn().execute("SELECT full_at, synced_at FROM sync_state WHERE kind = ?", (kind,)).fetchone()
+        return row or (None, None)
+
+    def _mark(self, conn, kind, full):
+        now = time.time()
+        if full:
+            conn.execute("INSERT OR REPLACE INTO sync_state (kind, full_at, synced_at) VALUES (?, ?, ?)",
+                         (kind, now, now))
+        else:
+            conn.execute("UPDATE sync_state SET synced_at = ? WHERE kind = ?", (now, kind))
+
+    def _row(self, kind, song):
+        track = self.format_track(song)
+        album = song.get("album")
+        album = album.get("name", "") if isinstance(album, dict) else (album or "")
+        return (kind, song["videoId"], track.get("title", ""), ", ".join(track.get("artists", [])), album,
+                song.get("duration", ""), song.get("duration_seconds"), json.dumps(track))
+
+    def _upsert(self, conn, rows_with_seq):
+        conn.executemany(
+            "INSERT INTO songs (kind, video_id, title, artists, album, duration, duration_seconds, payload, seq) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, video_id) DO UPDATE SET title = excluded.title, artists = excluded.artists, "
+            "album = excluded.album, duration = excluded.duration, "
+            "duration_seconds = excluded.duration_seconds, payload = excluded.payload, seq = excluded.seq",
+            rows_with_seq
+        )
+
+    def _sync_songs(self, kind, fetch):
+        conn = self._conn()
+        full_at, _ = self._state(kind)
+        if full_at is None or time.time() - full_at > self.full_interval:
+            return self._full_sync(kind, fetch(limit=None, order="recently_added"))
+
+        # Newest first; everything before the first known id is new
+        recent = [s for s in fetch(limit=self.window, order="recently_added") if s.get("videoId")]
+        known = {row[0] for row in conn.execute(
+            f"SELECT video_id FROM songs WHERE kind = ? AND video_id IN ({','.join('?' * len(recent))})",
+            (kind, *[s["videoId"] for s in recent])
+        )} if recent else set()
+        new = []
+        for song in recent:
+            if song["videoId"] in known:
+                break
+            new.append(song)
+        if len(new) == len(recent) and len(recent) >= self.window:
+            # No overlap with the mirror: more was added than the window shows
+            return self._full_sync(kind, fetch(limit=None, order="recently_added"))
+
+        with conn:
+            top = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM songs WHERE kind = ?", (kind,)).fetchone()[0]
+            self._upsert(conn, [(*self._row(kind, song), top + len(new) - i) for i, song in enumerate(new)])
+            self._mark(conn, kind, full=False)
+        return bool(new)
+
+    def _full_sync(self, kind, songs):
+        songs = [s for s in songs if s.get("videoId")]
+        conn = self._conn()
+        with conn:
+            before = {row[0] for row in conn.execute("SELECT video_id FROM songs WHERE kind = ?", (kind,))}
+            # Insertion order of the upstream list is newest first
+            seen = set()
+            rows = []
+            for i, song in enumerate(songs):
+                if song["videoId"] not in seen:
+                    seen.add(song["videoId"])
+                    rows.append((*self._row(kind, song), len(songs) - i))
+            self._upsert(conn, rows)
+            gone = before - seen
+            conn.executemany("DELETE FROM songs WHERE kind = ? AND video_id = ?", [(kind, v) for v in gone])
+            self._mark(conn, kind, full=True)
+        self.full_syncs += 1
+        return bool(gone or seen - before)
+
+    def _sync_playlists(self):
+        playlists = ytmusic.get_library_playlists(limit=None)
+        rows = [
+            (p.get("playlistId", ""), p.get("title", ""), int(p.get("count") or 0),
+             json.dumps([t.get("url", "") for t in p.get("thumbnails", [])]), i)
+            for i, p in enumerate(playlists) if p.get("playlistId")
+        ]
+        conn = self._conn()
+        with conn:
+            before = conn.execute(
+                "SELECT playlist_id, title, track_count, thumbnails, position FROM playlists ORDER BY position"
+            ).fetchall()
+            conn.execute("DELETE FROM playlists")
+            conn.executemany("INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?, ?)", rows)
+            self._mark(conn, "playlist", full=True)
+        return before != rows
+
+    # --- Queries ---
+
+    def ready(self, kind="song"):
+        """True once the mirror is running and a full sync of the kind has completed"""
+        return self._thread is not None and self._state(kind)[0] is not None
+
+    def songs(self, kind="song", limit=50, offset=0, sort=None, descending=None, q=None,
+              artist=None, album=None):
+        """
+        Page through mirrored songs.
+
+        Args:
+            kind (str): "song" for library songs, "upload" for uploads.
+            sort (str): One of SORTS. Defaults to "relevance" with q, otherwise "recent";
+                "recent" runs newest first, the rest ascending.
+            q (str): Full-text query across title, artists and album (prefix match on the last word).
+            artist / album (str): Case-insensitive substring filters.
+
+        Returns:
+            (list of track dicts, total matching count)
+        """
+        match = fts_query(q)
+        if sort is None or (sort == "relevance" and not match):
+            sort = "relevance" if match else "recent"
+        if descending is None:
+            descending = sort == "recent"
+        where, params, join = ["s.kind = ?"], [kind], ""
+        if match:
+            join = "JOIN songs_fts f ON f.rowid = s.id"
+            where.append("songs_fts MATCH ?")
+            params.append(match)
+        if artist:
+            where.append("s.artists LIKE ? ESCAPE '\\'")
+            params.append(_like(artist))
+        if album:
+            where.append("s.album LIKE ? ESCAPE '\\'")
+            params.append(_like(album))
+        conn = self._conn()
+        clause = f"FROM songs s {join} WHERE {' AND '.join(where)}"
+        total = conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+        direction = "DESC" if descending else "ASC"
+        rows = conn.execute(
+            f"SELECT s.payload {clause} ORDER BY {SORTS[sort]} {direction}, s.id LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+    def playlists(self, q=None, limit=None):
+        sql, params = "SELECT playlist_id, title, track_count, thumbnails FROM playlists", []
+        if q:
+            sql += " WHERE title LIKE ? ESCAPE '\\'"
+            params.append(_like(q))
+        sql += " ORDER BY position"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            {"playlist_id": pid, "title": title, "track_count": count, "thumbnails": json.loads(thumbs)}
+            for pid, title, count, thumbs in self._conn().execute(sql, params)
+        ]
+
+    def stats(self):
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT kind, COUNT(*) FROM songs GROUP BY kind").fetchall())
+        return {
+            "songs": counts.get("song", 0),
+            "uploads": counts.get("upload", 0),
+            "playlists": conn.execute("SELECT COUNT(*) FROM playlists").fetchone()[0],
+            "synced_at": {kind: synced for kind, _, synced in
+                          conn.execute("SELECT kind, full_at, synced_at FROM sync_state")},
+            "syncs": self.syncs,
+            "full_syncs": self.full_syncs,
+            "last_error": self.last_error
+        }
+
+
+library_mirror = LibraryMirror()
+if ENABLED:
+    startup.register("library_mirror", library_mirror.start, required=False)
@@ -1,30 +1,314 @@
+import os
+import bisect
 import subprocess
+import threading
 import time
 import logging
+import requests
+from collections import OrderedDict
+import http_pool
+from lyrics_cache import lyrics_cache
 
 logger = logging.getLogger(__name__)
 
-def start_lyrica(folder_name="Lyrica", port=9999):
+LYRICA_HOST = "127.0.0.1"
+LYRICA_PORT = int(os.environ.get("MUSICANA_LYRICA_PORT", 9999))
+POOL_SIZE = int(os.environ.get("MUSICANA_LYRICA_POOL", 8))    # max concurrent Lyrica calls
+READY_TIMEOUT = 30          # seconds to wait for the sidecar to answer after a (re)start
+HEALTH_INTERVAL = 0.25      # poll interval while waiting for readiness
+MAX_RESTART_BACKOFF = 30
+EXTERNAL_CHECK_INTERVAL = 5  # health-check period for a sidecar some other process started
+EXTERNAL_MAX_FAILURES = 3   # failed checks in a row before we spawn our own
+
+
+def lyrica_url(path="/", port=None):
+    return f"http://{LYRICA_HOST}:{port or LYRICA_PORT}{path}"
+
+
+# One keep-alive pool for all Lyrica traffic; the semaphore bounds concurrency
+# so a burst of lyric lookups queues here instead of swamping the sidecar.
+# The supervisor handles a dead sidecar, so failed calls are not retried.
+http_pool.configure(lyrica_url(), pool_maxsize=POOL_SIZE, retries=0)
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+
+
+def lyrica_request(path, params=None, timeout=15, port=None):
+    """GET a Lyrica path over the shared keep-alive pool"""
+    with _slots:
+        return http_pool.get(lyrica_url(path, port), params=params, timeout=timeout)
+
+
+def fetch_lyrica(artist, title, timestamps=False, timeout=15):
+    """Query Lyrica for a song; returns the raw requests.Response"""
+    params = {"artist": artist, "song": title}
+    if timestamps:
+        params["timestamps"] = "true"
+    return lyrica_request("/lyrics/", params=params, timeout=timeout)
+
+
+class LyricaError(Exception):
+    """Lyrica answered with an unexpected HTTP status"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Lyrica API failed with {status_code}")
+        self.status_code = status_code
+
+
+def resolve_lyrics(video_id, get_song, timeout=15):
     """
-    Start the Lyrica Flask server automatically.
+    Look up lyrics for a video, going to YTMusic and Lyrica only on a cache miss.
+
+    Args:
+        video_id (str): YouTube video id.
+        get_song (callable): ytmusic.get_song of the caller's client.
+        timeout (int): Lyrica request timeout in seconds.
+
+    Returns:
+        tuple: (artist, title, data) where data is Lyrica's "data" object,
+        or None when the song has no lyrics.
+    """
+    cached = lyrics_cache.get_by_video(video_id)
+    if cached:
+        artist, title, entry = cached
+    else:
+        song = get_song(video_id)
+        title = song.get("videoDetails", {}).get("title", "")
+        artist = song.get("videoDetails", {}).get("author", "")
+        if not title or not artist:
+            return artist, title, None
+
+        entry = lyrics_cache.get(artist, title)
+        if entry is not None:
+            lyrics_cache.link_video(video_id, artist, title)
+    lyrics_cache.record(entry)
+    if entry is not None:
+        return artist, title, entry["data"]
+
+    response = fetch_lyrica(artist, title, timestamps=True, timeout=timeout)
+    if response.status_code == 404:
+        data = None
+    elif response.status_code != 200:
+        raise LyricaError(response.status_code)   # transient, never cached
+    else:
+        data = response.json().get("data") or None
+        if data and not (data.get("timed_lyrics") or data.get("lyrics")):
+            data = None
+    lyrics_cache.put(artist, title, data, video_id=video_id)
+    return artist, title, data
+
+
+def plain_lyrics(data):
+    """Plain-text lyrics from a Lyrica data object (timed lines joined if needed)"""
+    if not data:
+        return ""
+    if data.get("lyrics"):
+        return data["lyrics"]
+    return "\n".join(line.get("text", "") for line in data.get("timed_lyrics") or [])
+
+
+def lyric_lines(data):
+    """Normalize a Lyrica data object to [{"start", "end", "text"}] (times in ms)"""
+    if not data:
+        return []
+    if "timed_lyrics" in data:
+        return [
+            {
+                "start": line.get("start_time"),
+                "end": line.get("end_time"),
+                "text": line.get("text", "")
+            }
+            for line in data["timed_lyrics"]
+        ]
+    if "lyrics" in data:
+        return [{"start": None, "end": None, "text": line} for line in data["lyrics"].splitlines()]
+    return []
+
+
+class LyricsTimeline:
+    """Timed lyric lines with a precomputed start index for O(log n) seeks"""
+
+    def __init__(self, lines):
+        self.lines = sorted(
+            (line for line in lines if isinstance(line.get("start"), (int, float))),
+            key=lambda line: line["start"]
+        )
+        self.starts = [line["start"] for line in self.lines]
+
+    def index_at(self, position_ms):
+        """Index of the line showing at position_ms, or -1 before the first line"""
+        return bisect.bisect_right(self.starts, position_ms) - 1
+
+    def __len__(self):
+        return len(self.lines)
+
+
+TIMELINE_CACHE_SIZE = 512
+_timelines = OrderedDict()
+_timelines_lock = threading.Lock()
+
+
+def get_timeline(video_id, get_song):
+    """Return (artist, title, source, LyricsTimeline) for a video, memoized in-process"""
+    with _timelines_lock:
+        if video_id in _timelines:
+            _timelines.move_to_end(video_id)
+            return _timelines[video_id]
+
+    artist, title, data = resolve_lyrics(video_id, get_song)
+    entry = (artist, title, (data or {}).get("source", "Lyrica API"), LyricsTimeline(lyric_lines(data)))
+    if not entry[3]:
+        return entry    # negative results expire in the store; don't pin them here
+    with _timelines_lock:
+        _timelines[video_id] = entry
+        while len(_timelines) > TIMELINE_CACHE_SIZE:
+            _timelines.popitem(last=False)
+    return entry
+
+
+class LyricaSupervisor:
+    """
+    Runs the Lyrica sidecar, waits for it to answer HTTP before reporting
+    ready, and restarts it with backoff if it exits.
+
+    Output goes to a log file inside the Lyrica folder rather than to pipes
+    nobody reads, so the sidecar can never block on a full pipe buffer.
+    """
+
+    def __init__(self, folder_name="Lyrica", port=LYRICA_PORT, health_path="/"):
+        self.folder_name = folder_name
+        self.port = port
+        self.health_path = health_path
+        self.log_path = os.path.join(folder_name, "lyrica.log")
+        self.process = None
+        self.restarts = 0
+        self.ready = False
+        self._stopping = False
+        self._watcher = None
+
+    def start(self):
+        """Spawn the sidecar and block until it is ready (or READY_TIMEOUT passes)"""
+        if self._answering():
+            # e.g. the Flask reloader's parent process already started one
+            logger.info(f"Lyrica already running on port {self.port}; not spawning another")
+            self.ready = True
+            watch = self._watch_external
+        else:
+            self._spawn()
+            self.ready = self.wait_ready()
+            watch = self._watch
+        self._watcher = threading.Thread(target=watch, name="lyrica-supervisor", daemon=True)
+        self._watcher.start()
+        return self.ready
+
+    def _watch_external(self):
+        """Health-check a sidecar we did not start; take over once it stops answering"""
+        failures = 0
+        while not self._stopping:
+            time.sleep(EXTERNAL_CHECK_INTERVAL)
+            if self._answering():
+                failures = 0
+                self.ready = True
+                continue
+            failures += 1
+            self.ready = False
+            if failures >= EXTERNAL_MAX_FAILURES and not self._stopping:
+                logger.warning(f"Lyrica on port {self.port} stopped answering; starting our own")
+                try:
+                    self._spawn()
+                    self.restarts += 1
+                    self.ready = self.wait_ready()
+                except Exception as e:
+                    logger.error(f"Failed to start Lyrica: {e}")
+                    return
+                self._watch()
+                return
+
+    def _spawn(self):
+        with open(self.log_path, "ab") as log:
+            self.process = subprocess.Popen(
+                ["python3", "lyrica.py"],
+                cwd=self.folder_name,   # "Lyrica" or "lyrica"
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                # The sidecar reads its listen port from the environment
+                env=dict(os.environ, PORT=str(self.port), LYRICA_PORT=str(self.port))
+            )
+        logger.info(f"Lyrica server starting on port {self.port} (pid {self.process.pid})")
+
+    def _answering(self):
+        try:
+            http_pool.get(lyrica_url(self.health_path, self.port), timeout=1)
+            return True
+        except requests.RequestException:
+            return False
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Poll the health path until the sidecar answers or dies"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                logger.error(f"Lyrica exited with code {self.process.returncode} during startup")
+                return False
+            if self._answering():
+                logger.info(f"Lyrica server ready on port {self.port}")
+                return True
+            time.sleep(HEALTH_INTERVAL)
+        logger.warning(f"Lyrica did not become ready within {timeout}s")
+        return False
+
+    def _watch(self):
+        backoff = 1
+        while not self._stopping:
+            started = time.time()
+            code = self.process.wait()
+            self.ready = False
+            if self._stopping:
+                return
+            # A sidecar that stayed up for a while gets a fresh backoff
+            if time.time() - started > MAX_RESTART_BACKOFF:
+                backoff = 1
+            logger.warning(f"Lyrica exited with code {code}; restarting in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+            try:
+                self._spawn()
+                self.restarts += 1
+                self.ready = self.wait_ready()
+            except Exception as e:
+                logger.error(f"Failed to restart Lyrica: {e}")
+                return
+
+    def stop(self):
+        self._stopping = True
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def describe(self):
+        return {
+            "pid": self.process.pid if self.process else None,
+            "external": self.process is None,
+            "ready": self.ready,
+            "restarts": self.restarts,
+            "log": self.log_path
+        }
+
+
+def start_lyrica(folder_name="Lyrica", port=LYRICA_PORT):
+    """
+    Start the Lyrica Flask server under a supervisor.
 
     Args:
         folder_name (str): The folder where lyrica.py is located.
-        port (int): Port where Lyrica runs (default 9999).
+        port (int): Port where Lyrica runs (default LYRICA_PORT, 9999 unless MUSICANA_LYRICA_PORT is set).
 
     Returns:
-        subprocess.Popen: The process handle for Lyrica, or None on failure.
+        LyricaSupervisor: The running supervisor, or None on failure.
     """
     try:
-        lyrica_process = subprocess.Popen(
-            ["python3", "lyrica.py"],
-            cwd=folder_name,   # "Lyrica" or "lyrica"
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        logger.info(f"Lyrica server started on port {port}")
-        time.sleep(3)  # give server time to boot
-        return lyrica_process
+        supervisor = LyricaSupervisor(folder_name=folder_name, port=port)
+        supervisor.start()
+        return supervisor
     except Exception as e:
         logger.error(f"Failed to start Lyrica server: {e}")
         return None
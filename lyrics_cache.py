@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+
+# Lyrics never change, so positive entries are kept forever; "no lyrics"
+# answers are retried after NEGATIVE_TTL in case Lyrica gains coverage.
+DB_PATH = os.environ.get("MUSICANA_LYRICS_DB", os.path.join("data", "lyrics.db"))
+NEGATIVE_TTL = int(os.environ.get("MUSICANA_LYRICS_NEGATIVE_TTL", 6 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lyrics (
+    key TEXT PRIMARY KEY,
+    artist TEXT,
+    title TEXT,
+    payload BLOB,
+    found INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    artist TEXT,
+    title TEXT
+);
+"""
+
+_NOISE = re.compile(
+    r"\s*[\(\[][^\)\]]*\b(official|video|audio|lyrics?|visualizer|remaster(ed)?|hd|hq|mv)\b[^\)\]]*[\)\]]",
+    re.IGNORECASE,
+)
+_FEAT = re.compile(r"\s*[\(\[]?\s*\b(feat\.?|ft\.?|featuring)\b.*$", re.IGNORECASE)
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _NOISE.sub("", text)
+    text = _FEAT.sub("", text)
+    text = re.sub(r"\s+-\s+topic$", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def normalize_key(artist, title):
+    """Cache key that survives casing, accents, '(Official Video)' and 'feat.' noise"""
+    return f"{_normalize(artist)}|{_normalize(title)}"
+
+
+class LyricsCache:
+    """SQLite-backed lyrics store with zlib-compressed payloads"""
+
+    def __init__(self, path=DB_PATH, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _row_to_entry(self, row):
+        payload, found, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+        data = json.loads(zlib.decompress(payload)) if payload else None
+        return {"found": bool(found), "data": data}
+
+    def get(self, artist, title):
+        """Return {"found", "data"} for a song, or None on a miss/expired entry"""
+        row = self._conn().execute(
+            "SELECT payload, found, expires_at FROM lyrics WHERE key = ?",
+            (normalize_key(artist, title),)
+        ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get_by_video(self, video_id):
+        """
+        Resolve a videoId without touching YTMusic.
+
+        Returns (artist, title, entry) when the video has been seen before;
+        entry is None if its lyrics entry has expired.
+        """
+        row = self._conn().execute(
+            "SELECT v.artist, v.title, l.payload, l.found, l.expires_at "
+            "FROM videos v LEFT JOIN lyrics l ON l.key = v.key WHERE v.video_id = ?",
+            (video_id,)
+        ).fetchone()
+        if not row:
+            return None
+        artist, title = row[0], row[1]
+        entry = self._row_to_entry(row[2:]) if row[3] is not None else None
+        return artist, title, entry
+
+    def record(self, entry):
+        """Count one lookup as a hit or miss, however many queries it took"""
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def put(self, artist, title, data, video_id=None):
+        """Store Lyrica's data object; data=None records a negative result"""
+        key = normalize_key(artist, title)
+        now = time.time()
+        found = data is not None
+        payload = zlib.compress(json.dumps(data).encode("utf-8")) if found else None
+        expires_at = None if found else now + self.negative_ttl
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lyrics (key, artist, title, payload, found, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, artist, title, payload, int(found), now, expires_at)
+            )
+            if video_id:
+                conn.execute(
+                    "INSERT OR REPLACE INTO videos (video_id, key, artist, title) VALUES (?, ?, ?, ?)",
+                    (video_id, key, artist, title)
+                )
+
+    def link_video(self, video_id, artist, title):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO videos (video_id, key, artist, title) VALUES (?, ?, ?, ?)",
+                (video_id, normalize_key(artist, title), artist, title)
+            )
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "path": self.path}
+
+
+lyrics_cache = LyricsCache()
@@ -0,0 +1,124 @@
+import io
+import os
+import time
+import zipfile
+import logging
+from ytm_pool import ytmusic
+from downloader import start_async_download, get_download_status, DOWNLOAD_WORKERS, PIPE_CHUNK
+from download_scheduler import QueueFull
+
+logger = logging.getLogger(__name__)
+
+WINDOW = DOWNLOAD_WORKERS * 2   # track jobs submitted ahead of the archive writer
+POLL_INTERVAL = 0.5
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, unseekable target for ZipFile.
+
+    zipfile falls back to data descriptors when it can't seek, so entries are
+    written strictly in order and whatever has been written so far can be
+    drained and sent before the archive is finished.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def resolve_tracks(playlist_id, limit=None):
+    """
+    Title and tracks of a playlist or album.
+
+    Album browse ids (MPREb...) go through get_album; everything else,
+    including album playlist ids (OLAK5uy...), through get_playlist.
+
+    Returns:
+        tuple: (title, tracks) where tracks are ytmusicapi track dicts.
+    """
+    if playlist_id.startswith("MPREb"):
+        album = ytmusic.get_album(playlist_id)
+        tracks = album.get("tracks", [])
+        return album.get("title") or playlist_id, tracks[:limit] if limit else tracks
+    playlist = ytmusic.get_playlist(playlist_id, limit=limit)
+    return playlist.get("title") or playlist_id, playlist.get("tracks", [])
+
+
+def _track_label(track):
+    artists = ", ".join(a.get("name", "") for a in track.get("artists") or [])
+    return f"{artists} - {track.get('title', '')}" if artists else track.get("title", "")
+
+
+def stream_zip(tracks, quality="high", fmt="m4a"):
+    """
+    Yield a ZIP archive of the tracks as their downloads finish.
+
+    Track jobs go through the regular download scheduler at low priority
+    (cached artifacts complete immediately), at most WINDOW at a time. Each
+    finished file is copied into the archive as a stored entry, in completion
+    order, and the bytes are yielded as they are written. Tracks that could
+    not be downloaded are listed in failed.txt at the end.
+    """
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+    pending = list(enumerate(tracks, 1))
+    pending.reverse()
+    running = []        # (job_id, index, track)
+    failed = []
+
+    while pending or running:
+        while pending and len(running) < WINDOW:
+            index, track = pending[-1]
+            if not track.get("videoId"):
+                failed.append(f"{index:03d} {_track_label(track)}: not available")
+                pending.pop()
+                continue
+            try:
+                job_id = start_async_download(track["videoId"], quality, "low", fmt)
+            except QueueFull:
+                break       # try again once some of ours have finished
+            pending.pop()
+            running.append((job_id, index, track))
+
+        finished = [entry for entry in running
+                    if get_download_status(entry[0])["status"] in ("completed", "failed", "not_found")]
+        if not finished:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        for entry in finished:
+            running.remove(entry)
+            job_id, index, track = entry
+            job = get_download_status(job_id)
+            if job["status"] != "completed" or not os.path.exists(job["file"]):
+                failed.append(f"{index:03d} {_track_label(track)}: {job.get('error') or job['status']}")
+                continue
+            name = f"{index:03d} - {job.get('download_name') or os.path.basename(job['file'])}"
+            with open(job["file"], "rb") as src, archive.open(name, "w", force_zip64=True) as dest:
+                for chunk in iter(lambda: src.read(PIPE_CHUNK), b""):
+                    dest.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+
+    if failed:
+        logger.warning(f"Playlist export finished with {len(failed)} failed track(s)")
+        archive.writestr("failed.txt", "\n".join(failed) + "\n")
+    archive.close()
+    yield sink.drain()
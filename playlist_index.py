@@ -0,0 +1,118 @@
+import threading
+import time
+import logging
+from playlist_pages import playlist_pages
+
+logger = logging.getLogger(__name__)
+
+REVALIDATE_AFTER = 600      # seconds before an index is checked against upstream again
+MAX_PLAYLISTS = 512
+
+
+class PlaylistIndex:
+    """
+    Local videoId -> [setVideoId] membership index per playlist.
+
+    Built on first use by walking the playlist's continuation pages, then
+    kept current write-through from the add/remove responses, so edits need
+    only the mutation call itself. After REVALIDATE_AFTER seconds the index
+    is checked cheaply against the header track count on page 0 and rebuilt
+    only if it differs from the count seen at build time plus our own edits
+    (the playlist was edited elsewhere). A missing count is never a change.
+    """
+
+    def __init__(self, revalidate_after=REVALIDATE_AFTER, max_playlists=MAX_PLAYLISTS):
+        self.revalidate_after = revalidate_after
+        self.max_playlists = max_playlists
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        # playlist_id -> {"members": {videoId: [setVideoId]}, "count": n, "checked": t}, where count
+        # is the playlist header's track count (None when unknown), kept in step with edits
+        self._indexes = {}
+        self.builds = 0
+        self.revalidations = 0
+
+    def _build_lock(self, playlist_id):
+        with self._lock:
+            return self._build_locks.setdefault(playlist_id, threading.Lock())
+
+    def _build(self, playlist_id):
+        playlist_pages.invalidate(playlist_id)
+        members = {}
+        for track, _ in playlist_pages.iter_tracks(playlist_id):
+            if track.get("videoId"):
+                members.setdefault(track["videoId"], []).append(track.get("setVideoId"))
+        # Compare header to header on revalidation: the walked tracks leave out
+        # unavailable ones, so their number need not match the header count
+        count = playlist_pages.page(playlist_id).get("meta", {}).get("track_count")
+        self.builds += 1
+        return {"members": members, "count": count, "checked": time.time()}
+
+    def _upstream_count(self, playlist_id):
+        playlist_pages.invalidate(playlist_id)
+        return playlist_pages.page(playlist_id).get("meta", {}).get("track_count")
+
+    def members(self, playlist_id):
+        """The playlist's membership map, building or revalidating it as needed"""
+        with self._build_lock(playlist_id):
+            with self._lock:
+                index = self._indexes.get(playlist_id)
+            if index and time.time() - index["checked"] > self.revalidate_after:
+                self.revalidations += 1
+                upstream = self._upstream_count(playlist_id)
+                if upstream is None or index["count"] is None or upstream == index["count"]:
+                    # An unknown count can't show a change; remember it for next time
+                    index["count"] = upstream if upstream is not None else index["count"]
+                    index["checked"] = time.time()
+                else:
+                    index = None
+            if index is None:
+                index = self._build(playlist_id)
+                with self._lock:
+                    self._indexes[playlist_id] = index
+                    while len(self._indexes) > self.max_playlists:
+                        oldest = min(self._indexes, key=lambda pid: self._indexes[pid]["checked"])
+                        del self._indexes[oldest]
+            return index["members"]
+
+    def record_added(self, playlist_id, edit_results):
+        """Apply the playlistEditResults of an add_playlist_items response"""
+        with self._lock:
+            index = self._indexes.get(playlist_id)
+            if not index:
+                return
+            for result in edit_results or []:
+                if result and result.get("videoId"):
+                    index["members"].setdefault(result["videoId"], []).append(result.get("setVideoId"))
+                    if index["count"] is not None:
+                        index["count"] += 1
+
+    def record_removed(self, playlist_id, items):
+        """Drop removed {"videoId", "setVideoId"} items from the index"""
+        with self._lock:
+            index = self._indexes.get(playlist_id)
+            if not index:
+                return
+            for item in items:
+                set_ids = index["members"].get(item["videoId"], [])
+                if item["setVideoId"] in set_ids:
+                    set_ids.remove(item["setVideoId"])
+                    if index["count"] is not None:
+                        index["count"] -= 1
+                if not set_ids:
+                    index["members"].pop(item["videoId"], None)
+
+    def forget(self, playlist_id):
+        with self._lock:
+            self._indexes.pop(playlist_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "playlists": len(self._indexes),
+                "builds": self.builds,
+                "revalidations": self.revalidations
+            }
+
+
+playlist_index = PlaylistIndex()
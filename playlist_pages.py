@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+import threading
+import time
+import logging
+from collections import OrderedDict
+from ytmusicapi.navigation import (
+    nav, TWO_COLUMN_RENDERER, TAB_CONTENT, SECTION_LIST_ITEM, SECTION, CONTENT,
+    RESPONSIVE_HEADER, EDITABLE_PLAYLIST_DETAIL_HEADER, HEADER, DESCRIPTION_SHELF
+)
+from ytmusicapi.continuations import CONTINUATION_ITEMS, get_continuation_token
+from ytmusicapi.parsers.playlists import parse_playlist_items, parse_playlist_header_meta
+from ytm_pool import ytmusic
+
+logger = logging.getLogger(__name__)
+
+PAGE_TTL = 300          # seconds a fetched page is served from memory
+MAX_PAGES = 2048        # pages kept across all playlists, least recently used dropped
+FALLBACK_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    """The cursor is malformed or belongs to another playlist"""
+
+
+def encode_cursor(playlist_id, index, offset, token):
+    raw = json.dumps({"p": playlist_id, "i": index, "o": offset, "t": token}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(playlist_id, cursor):
+    """(page index, offset in page, continuation token) from an opaque cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        index, offset, token = int(data["i"]), int(data["o"]), data["t"]
+    except (ValueError, KeyError, TypeError, binascii.Error) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+    if data.get("p") != playlist_id or index < 0 or offset < 0:
+        raise InvalidCursor("Cursor does not belong to this playlist")
+    return index, offset, token
+
+
+class PlaylistPages:
+    """
+    Playlist tracks one upstream continuation page at a time.
+
+    Page 0 is the playlist's browse response (header plus the first batch of
+    tracks); page k is fetched with the continuation token returned by page
+    k-1. Cursors carry the token, so any page can be fetched without its
+    predecessors. Parsed pages are kept in a small TTL/LRU cache keyed by
+    (playlist_id, index). Layouts this parser does not know (album audio
+    playlists) fall back to one full get_playlist call split into pages.
+    """
+
+    def __init__(self, ttl=PAGE_TTL, max_pages=MAX_PAGES):
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()     # (playlist_id, index) -> (expires, page)
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry and entry[0] > time.time():
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def _store(self, key, page):
+        with self._lock:
+            self._pages[key] = (time.time() + self.ttl, page)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def invalidate(self, playlist_id):
+        """Drop every cached page of a playlist (after it was edited)"""
+        with self._lock:
+            for key in [k for k in self._pages if k[0] == playlist_id]:
+                del self._pages[key]
+
+    def page(self, playlist_id, index=0, token=None):
+        """
+        Returns:
+            dict: {"meta": {...} (page 0 only), "tracks": [...], "next": token or None}
+        """
+        key = (playlist_id, index)
+        page = self._cached(key)
+        if page is not None:
+            return page
+        if index == 0:
+            page = self._first_page(playlist_id)
+        elif isinstance(token, str) and token.startswith("@"):
+            # Page of a fallback split; rebuild the split if it expired
+            self._fallback(playlist_id)
+            page = self._cached(key)
+            if page is None:
+                raise InvalidCursor("Cursor is past the end of the playlist")
+            return page
+        else:
+            page = self._continuation(token)
+        self._store(key, page)
+        return page
+
+    def _first_page(self, playlist_id):
+        browse_id = playlist_id if playlist_id.startswith("VL") else "VL" + playlist_id
+        response = ytmusic.send_request("browse", {"browseId": browse_id}, authenticated=True)
+        header_data = nav(response, [*TWO_COLUMN_RENDERER, *TAB_CONTENT, *SECTION_LIST_ITEM], True)
+        section_list = nav(response, [*TWO_COLUMN_RENDERER, "secondaryContents", *SECTION], True)
+        if not header_data or not section_list:
+            return self._fallback(playlist_id)
+
+        owned = EDITABLE_PLAYLIST_DETAIL_HEADER[0] in header_data
+        if owned:
+            header = nav(header_data, [*EDITABLE_PLAYLIST_DETAIL_HEADER, *HEADER, *RESPONSIVE_HEADER])
+        else:
+            header = nav(header_data, RESPONSIVE_HEADER)
+        header_meta = parse_playlist_header_meta(header)
+        description_shelf = nav(header, ["description", *DESCRIPTION_SHELF], True)
+        meta = {
+            "title": header_meta.get("title", ""),
+            "description": "".join(run["text"] for run in description_shelf["description"]["runs"])
+            if description_shelf else "",
+            "track_count": header_meta.get("trackCount"),      # None when the header has no count
+            "owned": owned
+        }
+
+        shelf = nav(section_list, [*CONTENT, "musicPlaylistShelfRenderer"], True) or {}
+        contents = shelf.get("contents", [])
+        return {
+            "meta": meta,
+            "tracks": parse_playlist_items(contents) if contents else [],
+            "next": get_continuation_token(contents) if contents else None
+        }
+
+    def _continuation(self, token):
+        if not token:
+            return {"tracks": [], "next": None}
+        response = ytmusic.send_request("browse", {"continuation": token}, authenticated=True)
+        items = nav(response, CONTINUATION_ITEMS, True)
+        if not items:
+            return {"tracks": [], "next": None}
+        return {"tracks": parse_playlist_items(items), "next": get_continuation_token(items)}
+
+    def _fallback(self, playlist_id):
+        playlist = ytmusic.get_playlist(playlist_id, limit=None)
+        tracks = playlist.get("tracks", [])
+        meta = {
+            "title": playlist.get("title", ""),
+            "description": playlist.get("description") or "",
+            "track_count": playlist.get("trackCount") or len(tracks),
+            "owned": playlist.get("owned", False)
+        }
+        chunks = [tracks[i:i + FALLBACK_PAGE_SIZE] for i in range(0, len(tracks), FALLBACK_PAGE_SIZE)] or [[]]
+        pages = [{"tracks": chunk, "next": f"@{i + 1}" if i + 1 < len(chunks) else None}
+                 for i, chunk in enumerate(chunks)]
+        pages[0]["meta"] = meta
+        for index, page in enumerate(pages):
+            self._store((playlist_id, index), page)
+        return pages[0]
+
+    def iter_tracks(self, playlist_id, index=0, offset=0, token=None):
+        """
+        Yield (track, cursor_after) from a position onwards, one page in
+        memory at a time. cursor_after resumes right after that track.
+        """
+        while True:
+            page = self.page(playlist_id, index, token)
+            tracks = page["tracks"]
+            for position in range(offset, len(tracks)):
+                if position + 1 < len(tracks):
+                    after = encode_cursor(playlist_id, index, position + 1, token)
+                elif page["next"]:
+                    after = encode_cursor(playlist_id, index + 1, 0, page["next"])
+                else:
+                    after = None
+                yield tracks[position], after
+            if not page["next"]:
+                return
+            index, offset, token = index + 1, 0, page["next"]
+
+    def stats(self):
+        with self._lock:
+            return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses}
+
+
+playlist_pages = PlaylistPages()
@@ -0,0 +1,133 @@
+import os
+import random
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import http_pool
+
+logger = logging.getLogger(__name__)
+
+CONNECTIONS = int(os.environ.get("MUSICANA_RANGE_CONNECTIONS", 4))
+CHUNK_SIZE = int(os.environ.get("MUSICANA_RANGE_CHUNK", 1024 * 1024))
+CHUNK_RETRIES = 3
+READ_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    """A byte range could not be fetched after all retries"""
+
+
+def split_ranges(size, chunk_size=CHUNK_SIZE):
+    """Inclusive (start, end) byte ranges covering size bytes"""
+    return [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+
+def _retry_or_raise(attempt, start, end, error):
+    """Sleep with jittered backoff before the next attempt, or give up"""
+    if attempt == CHUNK_RETRIES:
+        raise ChunkError(str(error)) from error
+    delay = (2 ** attempt) * 0.5 * (1 + random.random())
+    logger.warning(f"Chunk {start}-{end} failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+    time.sleep(delay)
+
+
+def download(url, path, size, on_progress=None, connections=CONNECTIONS, chunk_size=CHUNK_SIZE):
+    """
+    Fetch url into path using parallel Range requests over pooled connections.
+
+    The file is preallocated to size bytes and each chunk is written at its
+    own offset, so chunks can finish in any order. A failed chunk is retried
+    on its own with backoff; progress only counts bytes that stay written.
+
+    Args:
+        url (str): Direct media URL (must honour Range).
+        path (str): Destination file.
+        size (int): Total size in bytes.
+        on_progress (callable): on_progress(bytes_done, size), called from worker threads.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    done = [0]
+    lock = threading.Lock()
+    aborted = threading.Event()
+
+    def advance(n):
+        with lock:
+            done[0] += n
+            current = done[0]
+        if on_progress:
+            on_progress(current, size)
+
+    def fetch(byte_range):
+        start, end = byte_range
+        expected = end - start + 1
+        for attempt in range(CHUNK_RETRIES + 1):
+            if aborted.is_set():
+                return
+            written = 0
+            try:
+                with http_pool.get(url, headers={"Range": f"bytes={start}-{end}"},
+                                   stream=True, timeout=(5, 30)) as r:
+                    if r.status_code != 206 and not (r.status_code == 200 and start == 0 and expected == size):
+                        raise ChunkError(f"HTTP {r.status_code} for bytes {start}-{end}")
+                    for data in r.iter_content(READ_SIZE):
+                        if aborted.is_set():
+                            return
+                        if written + len(data) > expected:
+                            data = data[:expected - written]
+                        os.pwrite(fd, data, start + written)
+                        written += len(data)
+                        advance(len(data))
+                        if written >= expected:
+                            break
+                if written != expected:
+                    raise ChunkError(f"Short read for bytes {start}-{end}: {written}/{expected}")
+                return
+            except Exception as e:
+                advance(-written)
+                _retry_or_raise(attempt, start, end, e)
+
+    pool = ThreadPoolExecutor(max_workers=max(connections, 1), thread_name_prefix="range")
+    try:
+        os.ftruncate(fd, size)
+        # list() re-raises the first chunk failure
+        list(pool.map(fetch, split_ranges(size, chunk_size)))
+    except Exception:
+        # Don't finish the rest just to throw it away: the caller falls back
+        # to a whole-file download. Queued chunks are cancelled and running
+        # ones stop at their next read.
+        aborted.set()
+        raise
+    finally:
+        # Wait for running chunks before closing the fd they write to
+        pool.shutdown(wait=True, cancel_futures=True)
+        os.close(fd)
+    return path
+
+
+def stream(url, size, chunk_size=CHUNK_SIZE):
+    """
+    Yield the bytes of url in order, one Range request per chunk.
+
+    Used where the consumer is a pipe rather than a file. A chunk that breaks
+    off is resumed from the last byte yielded, so nothing is sent twice.
+    """
+    for start, end in split_ranges(size, chunk_size):
+        offset = start
+        for attempt in range(CHUNK_RETRIES + 1):
+            try:
+                with http_pool.get(url, headers={"Range": f"bytes={offset}-{end}"},
+                                   stream=True, timeout=(5, 30)) as r:
+                    if r.status_code != 206:
+                        raise ChunkError(f"HTTP {r.status_code} for bytes {offset}-{end}")
+                    for data in r.iter_content(READ_SIZE):
+                        data = data[:end + 1 - offset]
+                        yield data
+                        offset += len(data)
+                        if offset > end:
+                            break
+                if offset <= end:
+                    raise ChunkError(f"Short read for bytes {start}-{end}: stopped at {offset}")
+                break
+            except Exception as e:
+                _retry_or_raise(attempt, offset, end, e)
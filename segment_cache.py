@@ -0,0 +1,172 @@
+import os
+import shutil
+import threading
+import time
+import logging
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+import http_pool
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("MUSICANA_AUDIO_PROXY", "").lower() in ("1", "true", "yes")
+CACHE_DIR = os.environ.get("MUSICANA_PROXY_DIR", os.path.join("data", "segments"))
+CACHE_BYTES = int(os.environ.get("MUSICANA_PROXY_BYTES", 512 * 1024 ** 2))
+SEGMENT_SIZE = int(os.environ.get("MUSICANA_PROXY_SEGMENT", 512 * 1024))
+FETCH_TIMEOUT = 30
+URL_MARGIN = 120        # re-resolve stream URLs this long before googlevideo expires them
+
+
+class SourceExpired(Exception):
+    """Upstream rejected the stream URL; it has to be resolved again"""
+
+
+class AudioProxy:
+    """
+    Range-capable audio relay over a local segment cache.
+
+    Each source is split into fixed SEGMENT_SIZE segments stored as files
+    under CACHE_DIR. A missing segment is fetched upstream exactly once: the
+    first listener downloads it while concurrent listeners wait for the same
+    fetch. Resolved stream URLs are reused until shortly before they expire.
+    Segments are evicted least recently used once the byte budget is spent.
+
+    Args:
+        resolve (callable): resolve(video_id, quality) -> {"url", "size", "mimetype", "itag"}
+    """
+
+    def __init__(self, resolve, directory=CACHE_DIR, max_bytes=CACHE_BYTES, segment_size=SEGMENT_SIZE):
+        self.resolve = resolve
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._sources = {}          # (video_id, quality) -> (source, valid_until)
+        self._segments = OrderedDict()  # (itag, video_id, index) -> size, LRU first
+        self._inflight = {}         # segment key -> Event set when its fetch ends
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        # Segments from a previous run have no index entry; start clean
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def source(self, video_id, quality, refresh=False):
+        """Resolved stream for (video_id, quality), cached until its URL nears expiry"""
+        key = (video_id, quality)
+        with self._lock:
+            cached = self._sources.get(key)
+            if cached and not refresh and cached[1] > time.time():
+                return cached[0]
+        source = self.resolve(video_id, quality)
+        expire = parse_qs(urlparse(source["url"]).query).get("expire", [None])[0]
+        valid_until = (int(expire) - URL_MARGIN) if expire and expire.isdigit() else time.time() + 3600
+        with self._lock:
+            self._sources[key] = (source, valid_until)
+        return source
+
+    def _path(self, key):
+        itag, video_id, index = key
+        return os.path.join(self.directory, video_id, f"{itag}-{index}")
+
+    def _cached(self, key):
+        with self._lock:
+            if key in self._segments:
+                self._segments.move_to_end(key)
+                return True
+        return False
+
+    def _fetch(self, source, key):
+        _, _, index = key
+        start = index * self.segment_size
+        end = min(start + self.segment_size, source["size"]) - 1
+        r = http_pool.get(source["url"], headers={"Range": f"bytes={start}-{end}"}, timeout=(5, FETCH_TIMEOUT))
+        if r.status_code in (403, 410):
+            raise SourceExpired(f"HTTP {r.status_code}")
+        if r.status_code != 206 or len(r.content) != end - start + 1:
+            raise IOError(f"Segment fetch failed: HTTP {r.status_code}, {len(r.content)} bytes")
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".part", "wb") as f:
+            f.write(r.content)
+        os.replace(path + ".part", path)
+        with self._lock:
+            self._segments[key] = len(r.content)
+            self._bytes += len(r.content)
+            self._evict(keep=key)
+        return r.content
+
+    def _evict(self, keep):
+        while self._bytes > self.max_bytes and len(self._segments) > 1:
+            key, size = next(iter(self._segments.items()))
+            if key == keep:
+                self._segments.move_to_end(key)
+                continue
+            del self._segments[key]
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def segment(self, source, video_id, index):
+        """Bytes of one segment, fetching it upstream at most once across listeners"""
+        key = (source["itag"], video_id, index)
+        while True:
+            if self._cached(key):
+                try:
+                    with open(self._path(key), "rb") as f:
+                        data = f.read()
+                    self.hits += 1
+                    return data
+                except FileNotFoundError:
+                    continue    # evicted between the index check and the read
+            with self._lock:
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+            if not owner:
+                # Wait for the listener already fetching it; if that fetch
+                # failed, the next pass takes over as the fetcher
+                self.shared += 1
+                event.wait(FETCH_TIMEOUT * 2)
+                continue
+            try:
+                self.misses += 1
+                return self._fetch(source, key)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def read(self, video_id, quality, start, end):
+        """Yield bytes start..end (inclusive) of the source, segment by segment"""
+        source = self.source(video_id, quality)
+        offset = start
+        while offset <= end:
+            index = offset // self.segment_size
+            try:
+                data = self.segment(source, video_id, index)
+            except SourceExpired:
+                source = self.source(video_id, quality, refresh=True)
+                data = self.segment(source, video_id, index)
+            lo = offset - index * self.segment_size
+            hi = min(end - index * self.segment_size + 1, len(data))
+            yield data[lo:hi]
+            offset += hi - lo
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": ENABLED,
+                "segments": len(self._segments),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_fetches": self.shared,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long a request waits for a subsystem that is still booting
+INIT_TIMEOUT = float(os.environ.get("MUSICANA_INIT_TIMEOUT", 60))
+
+_SUBSYSTEMS = {}
+_LOCK = threading.Lock()
+
+
+class Subsystem:
+    """A named piece of heavy initialization that runs once, in the background"""
+
+    def __init__(self, name, init_func, required=True):
+        self.name = name
+        self.init_func = init_func
+        self.required = required
+        self.state = "pending"      # pending -> starting -> ready | failed
+        self.value = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self):
+        """Kick off initialization in a daemon thread (no-op if already started)"""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "starting"
+            self.started_at = time.time()
+        threading.Thread(target=self._run, name=f"init-{self.name}", daemon=True).start()
+
+    def _run(self):
+        try:
+            self.value = self.init_func()
+            self.state = "ready"
+            logger.info(f"Subsystem '{self.name}' ready in {time.time() - self.started_at:.2f}s")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            logger.error(f"Subsystem '{self.name}' failed to initialize: {e}")
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until initialized and return the value, raising if it failed"""
+        self.start()
+        if not self._done.wait(INIT_TIMEOUT if timeout is None else timeout):
+            raise RuntimeError(f"Subsystem '{self.name}' is still starting")
+        if self.state == "failed":
+            raise RuntimeError(f"Subsystem '{self.name}' unavailable: {self.error}")
+        return self.value
+
+    def describe(self):
+        elapsed = None
+        if self.started_at:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {"state": self.state, "required": self.required, "elapsed": elapsed, "error": self.error}
+
+
+def register(name, init_func, required=True):
+    """
+    Register a deferred initializer; nothing runs until start_all() or first use.
+    Optional subsystems are reported by /ready but do not gate readiness.
+    """
+    with _LOCK:
+        if name not in _SUBSYSTEMS:
+            _SUBSYSTEMS[name] = Subsystem(name, init_func, required)
+        return _SUBSYSTEMS[name]
+
+
+def start_all():
+    """Start every registered subsystem concurrently without blocking the caller"""
+    with _LOCK:
+        subsystems = list(_SUBSYSTEMS.values())
+    for subsystem in subsystems:
+        subsystem.start()
+
+
+def get(name, timeout=None):
+    """Return a subsystem's value, starting it on demand and waiting if needed"""
+    return _SUBSYSTEMS[name].wait(timeout)
+
+
+def status():
+    """Per-subsystem state for the readiness endpoint"""
+    with _LOCK:
+        subsystems = list(_SUBSYSTEMS.values())
+    return {s.name: s.describe() for s in subsystems}
+
+
+def is_ready():
+    with _LOCK:
+        return all(s.state == "ready" for s in _SUBSYSTEMS.values() if s.required)
+
+
+class LazyProxy:
+    """
+    Stand-in for a module-level object whose construction is deferred.
+
+    Attribute access resolves the named subsystem (blocking until it is
+    ready) so existing call sites like `ytmusic.search(...)` keep working.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        return getattr(get(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(get(self._name), attr, value)
+
+    def __repr__(self):
+        return f"<LazyProxy {self._name}>"
@@ -112,6 +112,12 @@
         const contentArea = document.getElementById('contentArea');
         const searchInput = document.getElementById('searchInput');
 
+        // Codecs this browser can play, so /stream can pick the leanest variant
+        const supportedCodecs = [
+            ['aac', 'audio/mp4; codecs="mp4a.40.2"'],
+            ['opus', 'audio/webm; codecs="opus"']
+        ].filter(([, type]) => audioPlayer.canPlayType(type)).map(([codec]) => codec).join(',');
+
         // Initialize
         document.addEventListener('DOMContentLoaded', () => {
             loadHomePage();
@@ -576,7 +582,7 @@
                 const queueData = await queueRes.json();
                 sessionId = queueData.session_id;
 
-                const streamRes = await fetch(`${API_BASE}/stream/${song.videoId}?quality=high`);
+                const streamRes = await fetch(`${API_BASE}/stream/${song.videoId}?quality=high&codecs=${supportedCodecs}`);
                 const streamData = await streamRes.json();
 
                 audioPlayer.src = streamData.stream_url;
@@ -630,34 +636,61 @@
             }
         }
 
+        let lyricIndex = -1;
+
         function displayLyrics() {
             const lyricsPanel = document.getElementById('lyricsPanel');
             lyricsPanel.innerHTML = currentLyrics.map((line, index) => 
                 `<div class="lyric-line" data-index="${index}" data-start="${line.start || 0}" data-end="${line.end || 999999}">${line.text || line}</div>`
             ).join('');
 
+            lyricIndex = -1;
+            audioPlayer.removeEventListener('timeupdate', syncLyrics);
+            audioPlayer.removeEventListener('seeked', resyncLyrics);
             audioPlayer.addEventListener('timeupdate', syncLyrics);
+            audioPlayer.addEventListener('seeked', resyncLyrics);
+        }
+
+        function setActiveLyric(index) {
+            if (index === lyricIndex) return;
+            const previous = document.querySelector(`.lyric-line[data-index="${lyricIndex}"]`);
+            if (previous) previous.classList.remove('active');
+            lyricIndex = index;
+            const lineElement = document.querySelector(`.lyric-line[data-index="${index}"]`);
+            if (lineElement) {
+                lineElement.classList.add('active');
+                lineElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            }
         }
 
         function syncLyrics() {
-            if (currentLyrics.length === 0) return;
-
-            const currentTime = audioPlayer.currentTime;
+            if (currentLyrics.length === 0 || currentLyrics[0].start == null) return;
 
-            currentLyrics.forEach((line, index) => {
-                const lineElement = document.querySelector(`.lyric-line[data-index="${index}"]`);
-                if (!lineElement) return;
+            // Lyric times are in ms; during normal playback only step forward
+            const now = audioPlayer.currentTime * 1000;
+            let index = lyricIndex;
+            while (index + 1 < currentLyrics.length && currentLyrics[index + 1].start <= now) {
+                index++;
+            }
+            setActiveLyric(index);
+        }
 
-                const start = parseFloat(lineElement.dataset.start) || 0;
-                const end = parseFloat(lineElement.dataset.end) || 999999;
+        async function resyncLyrics() {
+            if (!currentSong || currentLyrics.length === 0 || currentLyrics[0].start == null) return;
 
-                if (currentTime >= start && currentTime < end) {
-                    lineElement.classList.add('active');
-                    lineElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
-                } else {
-                    lineElement.classList.remove('active');
-                }
-            });
+            // After a seek, ask the server which line is showing instead of rescanning
+            try {
+                const t = Math.floor(audioPlayer.currentTime * 1000);
+                const response = await fetch(`${API_BASE}/song/${currentSong.videoId}/lyrics/at?t=${t}`);
+                const data = await response.json();
+                if (!('start' in data)) return;
+                // data.index counts only timed lines in time order, so find the line by its start
+                const index = data.start == null ? -1 : currentLyrics.findIndex(line =>
+                    line.start === data.start && (!data.line || line.text === data.line.text));
+                setActiveLyric(index);
+            } catch (error) {
+                console.error('Lyrics resync error:', error);
+            }
         }
 
         function togglePlay() {
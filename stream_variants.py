@@ -0,0 +1,70 @@
+from urllib.parse import urlparse, parse_qs
+from transcode import normalize_codec
+
+# Quality targets in AAC-equivalent kbps, and how much further a kbps of
+# each codec goes: Opus at ~64 kbps is on par with AAC at ~96 kbps
+QUALITY_TARGETS = {"low": 48, "medium": 96, "high": 160}
+CODEC_EFFICIENCY = {"aac": 1.0, "opus": 1.5}
+# AAC plays everywhere (Safari/iOS included); Opus only when the client asks for it
+DEFAULT_CODECS = ("aac",)
+
+
+def _kbps(abr):
+    try:
+        return float((abr or "0").replace("kbps", ""))
+    except ValueError:
+        return 0.0
+
+
+def _expires_at(url):
+    expire = parse_qs(urlparse(url).query).get("expire", [None])[0]
+    return int(expire) if expire and expire.isdigit() else None
+
+
+def list_variants(yt):
+    """Every audio-only stream of a video as a plain dict, lowest bitrate first"""
+    variants = []
+    for stream in yt.streams.filter(only_audio=True):
+        codec = normalize_codec(stream.audio_codec)
+        try:
+            filesize = stream.filesize
+        except Exception:
+            filesize = None
+        variants.append({
+            "itag": stream.itag,
+            "codec": codec,
+            "container": stream.subtype,
+            "mime_type": stream.mime_type,
+            "abr_kbps": _kbps(stream.abr),
+            "filesize": filesize,
+            "expires_at": _expires_at(stream.url),
+            "url": stream.url
+        })
+    variants.sort(key=lambda v: (v["abr_kbps"], v["codec"]))
+    return variants
+
+
+def effective_kbps(variant):
+    return variant["abr_kbps"] * CODEC_EFFICIENCY.get(variant["codec"], 1.0)
+
+
+def choose(variants, quality="medium", max_kbps=None, codecs=DEFAULT_CODECS):
+    """
+    Smallest variant whose effective bitrate meets the quality target.
+
+    Only codecs the client can play and bitrates under max_kbps are
+    considered. If none of those reaches the target, the best of them is
+    used; if the cap rules out everything, the smallest playable variant.
+    Returns None when the client supports none of the codecs.
+    """
+    playable = [v for v in variants if v["codec"] in codecs]
+    if not playable:
+        return None
+    capped = [v for v in playable if not max_kbps or v["abr_kbps"] <= max_kbps]
+    if not capped:
+        return min(playable, key=lambda v: v["abr_kbps"])
+    target = QUALITY_TARGETS[quality]
+    meeting = [v for v in capped if effective_kbps(v) >= target]
+    if meeting:
+        return min(meeting, key=lambda v: (v["abr_kbps"], v["filesize"] or 0))
+    return max(capped, key=effective_kbps)
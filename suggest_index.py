@@ -0,0 +1,182 @@
+import bisect
+import heapq
+import os
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+from catalog import catalog
+import startup
+
+logger = logging.getLogger(__name__)
+
+# Terms come from three places, weighted by how much they say about what
+# people will type: upstream suggestions, titles/artists seen in upstream
+# responses (weighted by times seen), and searches that found something.
+# A search counts no more than one catalogue sighting, so half-typed
+# queries from search-as-you-type clients cannot outrank real titles.
+MAX_TERMS = int(os.environ.get("MUSICANA_SUGGEST_MAX_TERMS", 200000))
+QUERY_WEIGHT = 1.0
+UPSTREAM_WEIGHT = 3.0
+CATALOG_WEIGHT = 1.0
+SEED_ITEMS = 50000          # most seen catalogue items loaded at startup
+TOP_K = 10                  # suggestions kept per cached prefix
+MAX_CACHED_PREFIXES = 20000
+MAX_ASKED = 50000
+MIN_LOCAL = 3               # fewer local matches than this and upstream is asked (once per prefix)
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(text.split())
+
+
+class PrefixIndex:
+    """
+    In-memory weighted prefix index for autocomplete.
+
+    Terms are kept in a sorted list of normalized keys, so all completions
+    of a prefix are one contiguous bisect range. The best TOP_K of a range
+    are computed once per prefix and cached; since weights only ever grow,
+    learning a term updates those cached lists in place instead of
+    invalidating them. Upstream is only needed for prefixes with too few
+    local completions, and each such prefix is asked at most once.
+    """
+
+    def __init__(self, max_terms=MAX_TERMS):
+        self.max_terms = max_terms
+        self._lock = threading.Lock()
+        self._keys = []                 # sorted normalized terms
+        self._terms = {}                # normalized -> [display text, weight]
+        self._top = OrderedDict()       # prefix -> [normalized terms], best first
+        self._asked = OrderedDict()     # prefixes already answered by upstream
+        self.hits = 0
+        self.misses = 0
+
+    def _add(self, text, weight):
+        key = normalize(text)
+        if not key:
+            return
+        term = self._terms.get(key)
+        if term is None:
+            self._terms[key] = term = [text.strip(), 0.0]
+            bisect.insort(self._keys, key)
+        term[1] += weight
+        # Weights only increase, so each cached list just needs this term merged in
+        for end in range(1, len(key) + 1):
+            top = self._top.get(key[:end])
+            if top is None:
+                continue
+            if key in top:
+                top.remove(key)
+            top.append(key)
+            top.sort(key=lambda k: self._terms[k][1], reverse=True)
+            del top[TOP_K:]
+
+    def _prune(self):
+        if len(self._terms) <= self.max_terms * 1.1:
+            return
+        keep = heapq.nlargest(self.max_terms, self._terms.items(), key=lambda item: item[1][1])
+        self._terms = dict(keep)
+        self._keys = sorted(self._terms)
+        self._top.clear()
+        self._warm()
+
+    def learn(self, texts, weight):
+        """Add weight to each text, inserting the ones not seen before"""
+        with self._lock:
+            for text in texts:
+                self._add(text, weight)
+            self._prune()
+
+    def learn_query(self, query):
+        """A search that returned results"""
+        self.learn([query], QUERY_WEIGHT)
+
+    def learn_suggestions(self, prefix, suggestions):
+        """Record an upstream answer: earlier suggestions weigh more"""
+        with self._lock:
+            count = len(suggestions)
+            for position, text in enumerate(suggestions):
+                self._add(text, UPSTREAM_WEIGHT * (1 + (count - position) / max(count, 1)))
+            self._asked[normalize(prefix)] = True
+            while len(self._asked) > MAX_ASKED:
+                self._asked.popitem(last=False)
+            self._prune()
+
+    def learn_catalog(self, items):
+        """Catalogue listener: titles, and each artist of a track separately"""
+        texts = {}
+        for kind, title, subtitle, count in items:
+            texts[title] = texts.get(title, 0) + count
+            if kind == "track":
+                for artist in (subtitle or "").split(", "):
+                    if artist:
+                        texts[artist] = texts.get(artist, 0) + count
+        with self._lock:
+            for text, count in texts.items():
+                self._add(text, CATALOG_WEIGHT * count)
+            self._prune()
+
+    def _top_for(self, key):
+        top = self._top.get(key)
+        if top is None:
+            start = bisect.bisect_left(self._keys, key)
+            end = bisect.bisect_left(self._keys, key + "\U0010ffff", start)
+            top = heapq.nlargest(TOP_K, self._keys[start:end], key=lambda k: self._terms[k][1])
+            self._top[key] = top
+            while len(self._top) > MAX_CACHED_PREFIXES:
+                self._top.popitem(last=False)
+        else:
+            self._top.move_to_end(key)
+        return top
+
+    def _warm(self):
+        # One- and two-letter prefixes cover the most terms; rank them up front
+        for prefix in sorted({key[:2] for key in self._keys} | {key[:1] for key in self._keys}):
+            self._top_for(prefix)
+
+    def complete(self, prefix, limit=TOP_K):
+        """
+        Best completions of a prefix.
+
+        Returns:
+            (list of display strings, answered) where answered is False when
+            the index has too little data for this prefix and upstream has
+            not been asked about it yet.
+        """
+        key = normalize(prefix)
+        if not key:
+            return [], True
+        with self._lock:
+            top = self._top_for(key)
+            suggestions = [self._terms[k][0] for k in top[:limit]]
+            answered = len(top) >= min(MIN_LOCAL, limit) or key in self._asked
+        if answered:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return suggestions, answered
+
+    def seed(self):
+        """Load the most seen catalogue items (startup)"""
+        self.learn_catalog(catalog.popular(SEED_ITEMS))
+        with self._lock:
+            self._warm()
+        return self
+
+    def stats(self):
+        with self._lock:
+            return {
+                "terms": len(self._terms),
+                "cached_prefixes": len(self._top),
+                "asked_upstream": len(self._asked),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+suggest_index = PrefixIndex()
+catalog.listeners.append(suggest_index.learn_catalog)
+startup.register("suggest_index", suggest_index.seed, required=False)
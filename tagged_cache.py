@@ -0,0 +1,70 @@
+import functools
+import hashlib
+import time
+from flask import Response, current_app, request
+
+
+class TaggedCache:
+    """
+    View caching with tag-based invalidation on top of a flask-caching Cache.
+
+    Every tag has a version stored in the cache. A cached response's key
+    includes the current versions of its tags, so invalidating a tag is a
+    single version bump: entries under the old version become unreachable
+    and age out on their own. Mutating endpoints bump exactly the tags they
+    affect, which lets reads stay cached without serving stale writes.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _version(self, tag):
+        version = self.cache.get(f"tag/{tag}")
+        if version is None:
+            version = time.time_ns()
+            self.cache.set(f"tag/{tag}", version, timeout=0)
+        return version
+
+    def invalidate(self, *tags):
+        """Evict every cached response carrying any of the tags"""
+        for tag in tags:
+            self.cache.set(f"tag/{tag}", time.time_ns(), timeout=0)
+            self.invalidations += 1
+
+    def cached(self, tags, timeout=300, unless=None):
+        """
+        Cache a view's 200 responses, keyed on path, query string and tag versions.
+
+        Args:
+            tags (callable): tags(**view_args) -> list of tag strings for this request.
+            unless (callable): Skip the cache when unless() is true (e.g. streaming modes).
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if unless and unless():
+                    return view(*args, **kwargs)
+                versions = [f"{tag}@{self._version(tag)}" for tag in tags(**kwargs)]
+                query = sorted(request.args.items(multi=True))
+                digest = hashlib.md5(f"{request.path}?{query}|{versions}".encode("utf-8")).hexdigest()
+                key = f"tagged/{digest}"
+
+                entry = self.cache.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    body, mimetype = entry
+                    return Response(body, mimetype=mimetype)
+
+                self.misses += 1
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.cache.set(key, (response.get_data(), response.mimetype), timeout=timeout)
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
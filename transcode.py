@@ -0,0 +1,182 @@
+import os
+import re
+import subprocess
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Output containers. A source whose codec is in copy_codecs is remuxed with
+# stream copy; anything else is transcoded with the encode arguments.
+TARGETS = {
+    "m4a": {
+        "ext": "m4a",
+        "mimetype": "audio/mp4",
+        "source_ext": "mp4",
+        "copy_codecs": {"aac"},
+        "encode": ["-c:a", "aac"],
+        "cover": True,
+        # empty_moov puts the header first so playback can start on the first fragment
+        "stream_args": ["-movflags", "empty_moov+default_base_moof", "-frag_duration", "1000000", "-f", "mp4"]
+    },
+    "opus": {
+        "ext": "opus",
+        "mimetype": "audio/ogg",
+        "source_ext": "webm",
+        "copy_codecs": {"opus"},
+        "encode": ["-c:a", "libopus", "-b:a", "128k"],
+        "cover": False,     # the ogg muxer can't carry an attached picture stream
+        "stream_args": ["-f", "ogg"]
+    }
+}
+
+# CPU seconds per second of audio for an AAC/Opus encode, used to estimate
+# what a stream copy saved until real transcodes have been measured
+DEFAULT_TRANSCODE_COST = 0.05
+
+_stats_lock = threading.Lock()
+_stats = {
+    "copy_jobs": 0,
+    "transcode_jobs": 0,
+    "cpu_seconds": 0.0,
+    "cpu_seconds_saved": 0.0,
+    "transcode_cost": DEFAULT_TRANSCODE_COST
+}
+
+
+def normalize_codec(codec):
+    """Map pytubefix/ffprobe codec strings ('mp4a.40.2', 'aac', 'opus') to one name"""
+    codec = (codec or "").lower()
+    if codec.startswith("mp4a") or codec == "aac":
+        return "aac"
+    return codec.split(".")[0]
+
+
+def probe_codec(path, fallback=None):
+    """Audio codec of a file via ffprobe, or the fallback if ffprobe is unavailable"""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=codec_name", "-of", "default=nw=1:nk=1", path],
+            capture_output=True, text=True, timeout=15
+        )
+        if out.returncode == 0 and out.stdout.strip():
+            return normalize_codec(out.stdout.strip().splitlines()[0])
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"ffprobe failed for {path}: {e}")
+    return normalize_codec(fallback)
+
+
+def build_command(raw_file, final_file, fmt, source_codec, cover_file=None, tags=None):
+    """
+    ffmpeg argv for embedding tags into fmt; stream-copies audio when possible.
+
+    Returns:
+        tuple: (cmd, mode) where mode is "copy" or "transcode".
+    """
+    target = TARGETS[fmt]
+    mode = "copy" if source_codec in target["copy_codecs"] else "transcode"
+    audio_args = ["-c:a", "copy"] if mode == "copy" else target["encode"]
+
+    cmd = ["ffmpeg", "-y", "-i", raw_file]
+    if target["cover"] and cover_file and os.path.exists(cover_file):
+        cmd += [
+            "-i", cover_file,
+            "-map", "0:a", "-map", "1:v",
+            *audio_args, "-c:v", "png",
+            "-disposition:v:0", "attached_pic",
+        ]
+    else:
+        cmd += ["-map", "0:a", *audio_args, "-vn"]
+
+    for name, value in (tags or {}).items():
+        cmd += ["-metadata", f"{name}={value}"]
+    cmd.append(final_file)
+    return cmd, mode
+
+
+def build_stream_command(fmt, source_codec, tags=None):
+    """
+    ffmpeg argv reading the source from stdin and writing a streamable
+    container (fragmented MP4 / Ogg) to stdout. No cover art: the picture
+    would have to be known before the first byte goes out.
+
+    Returns:
+        tuple: (cmd, mode) where mode is "copy" or "transcode".
+    """
+    target = TARGETS[fmt]
+    mode = "copy" if source_codec in target["copy_codecs"] else "transcode"
+    audio_args = ["-c:a", "copy"] if mode == "copy" else target["encode"]
+
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+           "-map", "0:a", *audio_args, "-vn"]
+    for name, value in (tags or {}).items():
+        cmd += ["-metadata", f"{name}={value}"]
+    cmd += [*target["stream_args"], "pipe:1"]
+    return cmd, mode
+
+
+def _seconds(match):
+    h, m, s = map(float, match.groups())
+    return h * 3600 + m * 60 + s
+
+
+def run_ffmpeg(cmd, on_progress=None):
+    """
+    Run ffmpeg, reporting progress as a 0..1 fraction.
+
+    Returns:
+        tuple: (returncode, duration_seconds, cpu_seconds) where cpu_seconds
+        is ffmpeg's own user+system time (None where os.wait4 is missing).
+    """
+    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True)
+
+    # Track FFmpeg conversion progress
+    duration = None
+    for line in process.stderr:
+        if "Duration" in line:
+            match = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", line)
+            if match:
+                duration = _seconds(match)
+        if "time=" in line and duration and on_progress:
+            match = re.search(r"time=(\d+):(\d+):(\d+\.\d+)", line)
+            if match:
+                on_progress(min(_seconds(match) / duration, 1.0))
+
+    returncode, cpu_seconds = reap(process)
+    return returncode, duration, cpu_seconds
+
+
+def reap(process):
+    """Wait for an ffmpeg process; returns (returncode, cpu_seconds or None)"""
+    if process.returncode is not None:      # already collected by poll()
+        return process.returncode, None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, usage.ru_utime + usage.ru_stime
+    return process.wait(), None
+
+
+def record(mode, duration, cpu_seconds):
+    """Account one finished ffmpeg run; returns the estimated CPU seconds saved"""
+    saved = 0.0
+    with _stats_lock:
+        if cpu_seconds is not None:
+            _stats["cpu_seconds"] += cpu_seconds
+        if mode == "transcode":
+            _stats["transcode_jobs"] += 1
+            if duration and cpu_seconds is not None:
+                cost = cpu_seconds / duration
+                _stats["transcode_cost"] = 0.8 * _stats["transcode_cost"] + 0.2 * cost
+        else:
+            _stats["copy_jobs"] += 1
+            if duration:
+                saved = max(_stats["transcode_cost"] * duration - (cpu_seconds or 0.0), 0.0)
+                _stats["cpu_seconds_saved"] += saved
+    return round(saved, 3)
+
+
+def stats():
+    with _stats_lock:
+        return {k: round(v, 4) if isinstance(v, float) else v for k, v in _stats.items()}
@@ -0,0 +1,226 @@
+import os
+import glob
+import json
+import threading
+import time
+import logging
+import requests
+from ytmusicapi import YTMusic
+from auth_helper import get_oauth, get_header_auth
+import startup
+
+logger = logging.getLogger(__name__)
+
+GUEST_CLIENTS = int(os.environ.get("MUSICANA_GUEST_CLIENTS", 4))
+CLIENT_CONCURRENCY = int(os.environ.get("MUSICANA_CLIENT_CONCURRENCY", 2))  # in-flight calls per client
+IDENTITY_DIR = os.environ.get("MUSICANA_IDENTITY_DIR", "identities")       # extra oauth/header json files
+ACQUIRE_TIMEOUT = 30
+FAILURE_THRESHOLD = 3       # consecutive upstream failures before a client is benched
+COOLDOWN = 60               # seconds a benched client sits out
+
+# Methods that need a signed-in identity; everything else is served by guests
+AUTH_METHODS = {
+    "get_playlist", "create_playlist", "edit_playlist", "delete_playlist",
+    "add_playlist_items", "remove_playlist_items", "rate_song", "rate_playlist",
+    "get_liked_songs", "get_history", "add_history_item", "remove_history_items",
+    "subscribe_artists", "unsubscribe_artists", "edit_song_library_status",
+    "upload_song", "delete_upload_entity", "get_account_info",
+}
+
+
+def is_client_fault(error):
+    """Rate limiting and transport errors say something about the client, bad ids don't"""
+    if isinstance(error, requests.RequestException):
+        return True
+    message = str(error)
+    return "429" in message or "HTTP 5" in message
+
+
+class PooledClient:
+    """One YTMusic instance with a concurrency cap and health tracking"""
+
+    def __init__(self, name, client, concurrency=CLIENT_CONCURRENCY):
+        self.name = name
+        self.client = client
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_error = None
+
+    @property
+    def healthy(self):
+        return time.time() >= self.cooldown_until
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+
+class ClientPool:
+    """Spreads calls across clients, preferring healthy ones with free slots"""
+
+    def __init__(self, name, clients):
+        self.name = name
+        self.clients = clients
+        self._cond = threading.Condition()
+
+    def _pick(self):
+        candidates = [c for c in self.clients if c.in_flight < c.concurrency]
+        healthy = [c for c in candidates if c.healthy]
+        # Benched clients are still used if every healthy one is saturated or benched
+        pool = healthy or ([] if any(c.healthy for c in self.clients) else candidates)
+        return min(pool, key=lambda c: (c.in_flight, c.calls), default=None)
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                client = self._pick()
+                if client:
+                    client.in_flight += 1
+                    client.calls += 1
+                    return client
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError(f"No {self.name} YTMusic client available")
+                self._cond.wait(remaining)
+
+    def release(self, client, error=None):
+        with self._cond:
+            client.in_flight -= 1
+            if error is None:
+                client.consecutive_failures = 0
+            elif is_client_fault(error):
+                client.failures += 1
+                client.consecutive_failures += 1
+                client.last_error = str(error)
+                if client.consecutive_failures >= FAILURE_THRESHOLD:
+                    client.cooldown_until = time.time() + COOLDOWN
+                    client.consecutive_failures = 0
+                    logger.warning(f"YTMusic client '{client.name}' benched for {COOLDOWN}s: {error}")
+            self._cond.notify()
+
+    def call(self, method, *args, **kwargs):
+        client = self.acquire()
+        try:
+            result = getattr(client.client, method)(*args, **kwargs)
+        except Exception as e:
+            self.release(client, e)
+            raise
+        self.release(client)
+        return result
+
+    def describe(self):
+        with self._cond:
+            return [c.describe() for c in self.clients]
+
+
+class RoutedClient:
+    """
+    Drop-in replacement for a single YTMusic instance.
+
+    Public calls (search, charts, get_song, ...) are served by the guest pool;
+    library and playlist calls by the authenticated pool, which falls back to
+    the guest pool when no identity is configured.
+    """
+
+    def __init__(self, guest_pool, auth_pool):
+        self.guest_pool = guest_pool
+        self.auth_pool = auth_pool
+
+    @property
+    def authenticated(self):
+        """False in guest mode, where library calls would only fail"""
+        return self.auth_pool is not self.guest_pool
+
+    def pool_for(self, method):
+        if method in AUTH_METHODS or method.startswith("get_library"):
+            return self.auth_pool
+        return self.guest_pool
+
+    def __getattr__(self, method):
+        pool = self.pool_for(method)
+        if not callable(getattr(pool.clients[0].client, method)):
+            return getattr(pool.clients[0].client, method)
+
+        def call(*args, **kwargs):
+            return pool.call(method, *args, **kwargs)
+        call.__name__ = method
+        return call
+
+    def send_request(self, endpoint, body, authenticated=False):
+        """Raw InnerTube request on a pooled client, for paging ytmusicapi doesn't expose"""
+        pool = self.auth_pool if authenticated else self.guest_pool
+        return pool.call("_send_request", endpoint, body)
+
+    def describe(self):
+        return {
+            "guest": self.guest_pool.describe(),
+            "authenticated": self.auth_pool.describe() if self.auth_pool is not self.guest_pool else []
+        }
+
+
+def load_identities():
+    """oauth.json, header.json and every json file in IDENTITY_DIR, as (name, YTMusic)"""
+    identities = []
+    ytm = get_oauth()
+    if ytm:
+        identities.append(("oauth.json", ytm))
+    ytm = get_header_auth()
+    if ytm:
+        identities.append(("header.json", ytm))
+
+    for path in sorted(glob.glob(os.path.join(IDENTITY_DIR, "*.json"))):
+        try:
+            with open(path, "r") as f:
+                is_header = "cookie" in {k.lower() for k in json.load(f)}
+        except Exception as e:
+            logger.warning(f"Skipping identity {path}: {e}")
+            continue
+        ytm = get_header_auth(path) if is_header else get_oauth(path)
+        if ytm:
+            identities.append((os.path.basename(path), ytm))
+    return identities
+
+
+_router = None
+
+
+def build_router():
+    """Build the guest and authenticated pools (registered as the 'ytmusic' subsystem)"""
+    global _router
+    print("\n🔍 Checking authentication methods...\n")
+    guest_pool = ClientPool("guest", [
+        PooledClient(f"guest-{i}", YTMusic()) for i in range(max(GUEST_CLIENTS, 1))
+    ])
+
+    identities = load_identities()
+    if identities:
+        auth_pool = ClientPool("authenticated", [PooledClient(name, ytm) for name, ytm in identities])
+        print(f"✅ Logged in with {len(identities)} identit{'y' if len(identities) == 1 else 'ies'}: "
+              + ", ".join(name for name, _ in identities))
+    else:
+        auth_pool = guest_pool
+        print("⚠ No valid authentication found — running in guest mode")
+        print("   ➜ Playlist / library access will NOT work.")
+
+    _router = RoutedClient(guest_pool, auth_pool)
+    return _router
+
+
+def stats():
+    """Pool state for /metrics; empty until the pools are built"""
+    return _router.describe() if _router else {}
+
+
+startup.register("ytmusic", build_router)
+ytmusic = startup.LazyProxy("ytmusic")